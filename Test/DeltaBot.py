@@ -0,0 +1,40 @@
+import sys
+import random
+
+# Ask the engine to send only what changed since our last turn (session mode)
+BATTLESHIP_CAPABILITIES = ["delta"]
+
+ROWS = "ABCDEFGHIJ"
+ALL_MOVES = [row + str(col) for row in ROWS for col in range(1, 11)]
+
+def get_ships():
+    ships = [
+        ("Carrier", "A1", "A2", "A3", "A4", "A5"),
+        ("Battleship", "B2", "C2", "D2", "E2"),
+        ("Cruiser", "C3", "D3", "E3"),
+        ("Submarine", "D6", "E6", "F6"),
+        ("Destroyer", "E7", "E8")
+    ]
+    return "\n".join(",".join(ship) for ship in ships)
+
+# State kept between turns while the bot stays loaded
+remaining = []
+
+def place_ships():
+    return get_ships()
+
+def next_move(state):
+    global remaining
+    # A new game starts at turn 1
+    if state["turn"] == 1:
+        remaining = ALL_MOVES[:]
+        random.shuffle(remaining)
+    return remaining.pop()
+
+# Legacy argv entry point, used when the engine spawns a process per move
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1].lower() == "initialize":
+        print(get_ships())
+    else:
+        moves_list = sys.argv[3].split(" ")
+        print(random.choice([move for move in ALL_MOVES if move not in moves_list]))
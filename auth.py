@@ -67,6 +67,15 @@ async def require_user(request: Request)->User:
 # Alias for backward compatibility
 login_required = require_user
 
+def session_user(connection):
+    """
+    Get the logged-in user of a request or WebSocket, which cannot use require_user
+    :return: The session's user, or None if nobody is logged in or the session expired
+    """
+    if connection.session.get('session_expired'):
+        return None
+    return connection.session.get('user')
+
 def get_current_user(request: Request):
     """
     Get user info from session
@@ -0,0 +1,210 @@
+"""
+Lockstep batch engine for simulating many games at once with NumPy.
+
+BatchEngine holds K independent games as arrays and advances all of them by
+one shot per step(): hit, sunk and game-over detection are vectorized across
+the batch. It is meant for calibration and baseline runs with in-process
+strategies, not for uploaded bots, and uses the same fleet and rules as
+start_game: players alternate shots, repeating or out-of-range shots forfeit,
+and sinking the last ship wins.
+
+A strategy is a callable `strategy(view) -> moves` that receives a BatchView of
+the games where it is to move and returns one cell index (0..99) per game.
+"""
+import numpy as np
+
+from engine import CELLS, SIZE, MISS, HIT, SUNK
+from player import FLEET
+
+# Result code for a shot that forfeits the game, and for games already finished
+INVALID = -1
+FINISHED = -2
+
+
+class BatchView:
+    """
+    What a strategy sees for the games it has to move in.
+
+    games      - indices of those games in the batch
+    shots      - (n, 100) bool, cells already fired at
+    shot_hits  - (n, 100) bool, fired cells that hit a ship
+    rng        - the engine's numpy Generator
+    """
+    def __init__(self, games, shots, shot_hits, rng):
+        self.games = games
+        self.shots = shots
+        self.shot_hits = shot_hits
+        self.rng = rng
+
+
+def random_strategy(view):
+    """
+    Fires at a uniformly random cell that has not been tried yet.
+    """
+    noise = view.rng.random(view.shots.shape)
+    noise[view.shots] = -1.0
+    return noise.argmax(axis=1)
+
+
+def scalar_strategy(choose):
+    """
+    Adapts a per-game function to the batch strategy interface.
+    :param choose: Callable (shots_row, shot_hits_row) -> cell index for one game.
+    :return: A batch strategy.
+    """
+    def strategy(view):
+        return np.array([choose(view.shots[i], view.shot_hits[i]) for i in range(len(view.games))], dtype=np.int64)
+    return strategy
+
+
+def ship_positions(length):
+    """
+    :param length: Ship length.
+    :return: (P, length) array with the cells of every legal horizontal and vertical position.
+    """
+    span = np.arange(length)
+    horizontal = [row * SIZE + col + span for row in range(SIZE) for col in range(SIZE - length + 1)]
+    vertical = [(row + span) * SIZE + col for row in range(SIZE - length + 1) for col in range(SIZE)]
+    return np.array(horizontal + vertical, dtype=np.int64)
+
+
+class BatchEngine:
+    """
+    K concurrent games stored as arrays indexed [game, side, ...].
+
+    ship_at    - (K, 2, 100) int8, ship index on each side's board, -1 for open water
+    shots      - (K, 2, 100) bool, cells each side has fired at
+    shot_hits  - (K, 2, 100) bool, fired cells that hit
+    health     - (K, 2, S) int8, remaining health of every ship
+    remaining  - (K, 2) int8, ships still afloat
+    turn       - (K,) int8, side to move
+    winner     - (K,) int8, winning side or -1 while the game is running
+    """
+    def __init__(self, num_games, fleet=None, seed=None):
+        fleet = fleet or FLEET
+        self.num_games = num_games
+        self.ship_names = list(fleet)
+        self.ship_lengths = np.array([ship["length"] for ship in fleet.values()], dtype=np.int8)
+        self.rng = np.random.default_rng(seed)
+
+        ships = len(self.ship_names)
+        self.ship_at = np.full((num_games, 2, CELLS), -1, dtype=np.int8)
+        self.shots = np.zeros((num_games, 2, CELLS), dtype=bool)
+        self.shot_hits = np.zeros((num_games, 2, CELLS), dtype=bool)
+        self.health = np.tile(self.ship_lengths, (num_games, 2, 1))
+        self.remaining = np.full((num_games, 2), ships, dtype=np.int8)
+        self.turn = np.zeros(num_games, dtype=np.int8)
+        self.winner = np.full(num_games, -1, dtype=np.int8)
+        self.shot_count = np.zeros(num_games, dtype=np.int32)
+        self._games = np.arange(num_games)
+
+    @property
+    def done(self):
+        return self.winner >= 0
+
+    def set_placement(self, side, placement, games=None):
+        """
+        Places the same fleet on one side of several games.
+        :param side: 0 or 1.
+        :param placement: Ship name -> list of cell indices, as returned by placement.parse_placement().
+        :param games: Indices of the games to update; all games by default.
+        """
+        games = self._games if games is None else np.asarray(games)
+        layout = np.full(CELLS, -1, dtype=np.int8)
+        for index, ship_name in enumerate(self.ship_names):
+            layout[placement[ship_name]] = index
+        self.ship_at[games, side] = layout
+
+    def randomize_placements(self):
+        """
+        Gives every side of every game an independent, uniformly random legal fleet.
+        Ships are placed one at a time for the whole batch, re-drawing only where they overlap.
+        """
+        for side in (0, 1):
+            layout = np.full((self.num_games, CELLS), -1, dtype=np.int8)
+            for index, length in enumerate(self.ship_lengths):
+                options = ship_positions(int(length))
+                pending = self._games
+                while pending.size:
+                    picks = options[self.rng.integers(len(options), size=pending.size)]
+                    free = (layout[pending[:, None], picks] < 0).all(axis=1)
+                    layout[pending[free][:, None], picks[free]] = index
+                    pending = pending[~free]
+            self.ship_at[:, side] = layout
+
+    def view(self, games):
+        """
+        :param games: Indices of games.
+        :return: A BatchView from the perspective of the side to move in each game.
+        """
+        sides = self.turn[games]
+        return BatchView(games, self.shots[games, sides], self.shot_hits[games, sides], self.rng)
+
+    def step(self, moves):
+        """
+        Applies one shot for the side to move in every game.
+        :param moves: (K,) array of cell indices; entries for finished games are ignored.
+        :return: (K,) array of MISS, HIT, SUNK, INVALID (forfeit) or FINISHED per game.
+        """
+        moves = np.asarray(moves, dtype=np.int64)
+        games = self._games
+        active = self.winner < 0
+        attacker = self.turn
+        defender = 1 - attacker
+        results = np.full(self.num_games, FINISHED, dtype=np.int8)
+
+        in_range = (moves >= 0) & (moves < CELLS)
+        cells = np.where(in_range, moves, 0)
+        repeated = self.shots[games, attacker, cells]
+        invalid = active & (~in_range | repeated)
+        valid = active & ~invalid
+
+        # A bad shot forfeits the game to the defender, like start_game does
+        self.winner[invalid] = defender[invalid]
+        results[invalid] = INVALID
+
+        g, a, d, c = games[valid], attacker[valid], defender[valid], cells[valid]
+        target = self.ship_at[g, d, c]
+        hit = target >= 0
+        self.shots[g, a, c] = True
+        self.shot_hits[g[hit], a[hit], c[hit]] = True
+        self.shot_count[g] += 1
+        results[g] = MISS
+
+        hg, hd, ht = g[hit], d[hit], target[hit].astype(np.int64)
+        self.health[hg, hd, ht] -= 1
+        results[hg] = HIT
+
+        sunk = self.health[hg, hd, ht] == 0
+        sg, sd = hg[sunk], hd[sunk]
+        self.remaining[sg, sd] -= 1
+        results[sg] = SUNK
+
+        over = self.remaining[sg, sd] == 0
+        self.winner[sg[over]] = 1 - sd[over]
+
+        # Players alternate every shot, hit or miss
+        still_running = g[self.winner[g] < 0]
+        self.turn[still_running] ^= 1
+        return results
+
+    def run(self, strategy1, strategy2, max_steps=2 * CELLS + 1):
+        """
+        Plays every game to completion.
+        :param strategy1: Strategy for side 0, which moves first.
+        :param strategy2: Strategy for side 1.
+        :param max_steps: Safety bound on the number of lockstep steps.
+        :return: (K,) array with the winning side of each game.
+        """
+        strategies = (strategy1, strategy2)
+        moves = np.zeros(self.num_games, dtype=np.int64)
+        for _ in range(max_steps):
+            running = np.flatnonzero(self.winner < 0)
+            if running.size == 0:
+                break
+            for side in (0, 1):
+                games = running[self.turn[running] == side]
+                if games.size:
+                    moves[games] = strategies[side](self.view(games))
+            self.step(moves)
+        return self.winner.copy()
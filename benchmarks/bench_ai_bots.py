@@ -0,0 +1,90 @@
+"""
+Benchmark: move latency of the LLM-backed test bots, Test/AI_BOT_1.py and Test/AI_BOT_2.py.
+
+Both bots ask the OpenAI API for every move, so they need the `openai` and
+`python-dotenv` packages and an API_KEY; without them the bots are reported as
+skipped. Only moves are timed: the bots read their board from argv as soon as
+they are imported, so their `initialize` call cannot run.
+
+    python benchmarks/bench_ai_bots.py [--moves N] [--mode subprocess]
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bot_runner import BotLimitExceeded, make_bot
+from engine import cell_name
+from bench_serialization import mid_game_player
+
+AI_BOTS = (os.path.join(ROOT, "Test", "AI_BOT_1.py"), os.path.join(ROOT, "Test", "AI_BOT_2.py"))
+
+
+def skip_reason():
+    """
+    :return: Why the AI bots cannot be run here, or None if they can.
+    """
+    for module in ("openai", "dotenv"):
+        if importlib.util.find_spec(module) is None:
+            return f"the {module} package is not installed"
+    if not os.getenv("API_KEY"):
+        return "API_KEY is not set"
+    return None
+
+
+def run_bot(script_path, moves=3, mode=None):
+    """
+    Asks one AI bot for `moves` moves on a board 30 shots into a game.
+    :param mode: Bot mode; defaults to BOT_MODE.
+    :return: A result dictionary.
+    """
+    board = mid_game_player(30).board
+    fired = " ".join(cell_name(cell) for cell in range(100) if board.has_fired_at(cell))
+    runner = make_bot(script_path, mode)
+    latencies = []
+    errors = 0
+    try:
+        for _ in range(moves):
+            started = time.perf_counter()
+            try:
+                runner.next_move(board.ship_string(), board.attack_string(), fired)
+            except BotLimitExceeded:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+    finally:
+        runner.close()
+    latencies.sort()
+    return {
+        "benchmark": f"ai_bot[{os.path.basename(script_path)[:-3]}]",
+        "moves": moves,
+        "errors": errors,
+        "ms_per_move": sum(latencies) / len(latencies) * 1e3,
+        "max_ms_per_move": latencies[-1] * 1e3,
+    }
+
+
+def run(moves=3, mode=None):
+    """
+    :return: A list of result dictionaries, one per AI bot; a skipped bot's has a "skipped" reason.
+    """
+    reason = skip_reason()
+    if reason:
+        return [{"benchmark": f"ai_bot[{os.path.basename(path)[:-3]}]", "skipped": reason} for path in AI_BOTS]
+    return [run_bot(path, moves, mode) for path in AI_BOTS]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--moves", type=int, default=3)
+    parser.add_argument("--mode", default=None, help="bot mode; defaults to BOT_MODE")
+    args = parser.parse_args()
+    for result in run(args.moves, args.mode):
+        if "skipped" in result:
+            print(f"{result['benchmark']:20} skipped: {result['skipped']}")
+        else:
+            print(f"{result['benchmark']:20} {result['ms_per_move']:10.1f} ms/move  ({result['errors']} errors)")
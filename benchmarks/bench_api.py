@@ -0,0 +1,143 @@
+"""
+Benchmark: latency of POST /v2/matches.
+
+Mounts the matches router under /v2 the way main.py does, on a bare FastAPI app
+with the login check replaced by a benchmark user, and posts matches between two
+synthetic fast bots (see fast_bots.py). Two figures are reported:
+
+    api_ms          the request alone: validation, the Match row and the queued job
+    end_to_end_ms   the request plus the embedded worker playing the match, until
+                    the match is marked completed
+
+It writes to the database named by BENCH_DATABASE_URL and removes its rows
+afterwards; it is skipped when the variable is not set, so it never touches the
+database the app is configured with.
+
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_api.py [--requests N] [--rounds N]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fast_bots import write_fast_bots
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL")
+
+
+def summarize(prefix, latencies):
+    """
+    :param latencies: Request latencies in seconds.
+    :return: Mean, median and maximum in milliseconds, keyed `<prefix>_mean` etc.
+    """
+    return {
+        f"{prefix}_mean": statistics.mean(latencies) * 1e3,
+        f"{prefix}_p50": statistics.median(latencies) * 1e3,
+        f"{prefix}_max": max(latencies) * 1e3,
+    }
+
+
+def run(requests=20, rounds=1):
+    """
+    Posts `requests` matches with the embedded worker off, then `requests` with it on.
+    :param rounds: Games per match.
+    :return: A result dictionary.
+    """
+    if not BENCH_DATABASE_URL:
+        return {"benchmark": "post_match", "skipped": "BENCH_DATABASE_URL is not set"}
+    # The engine is created when database.py is imported, so point it at the benchmark database first
+    os.environ["DATABASE_URL"] = BENCH_DATABASE_URL
+    from fastapi import APIRouter, FastAPI
+    from fastapi.testclient import TestClient
+    from auth import require_user
+    from database import SessionLocal, engine
+    from models import Bot, BotLatencyDaily, Job, Match, User
+    from routes import matches
+    from schema import upgrade_schema
+    import jobs
+    import match_cache
+    import player
+
+    upgrade_schema(engine)
+    directory = tempfile.mkdtemp(prefix="battleship_bench_")
+    saved = player.uploads_dir, jobs.uploads_dir, jobs.EMBEDDED_WORKER, match_cache.MATCH_CACHE_SIZE
+    player.uploads_dir = jobs.uploads_dir = directory
+    # Every match has to be played, not served from the cache
+    match_cache.MATCH_CACHE_SIZE = 0
+
+    db = SessionLocal()
+    user = User(id=uuid.uuid4(), email=f"bench-{uuid.uuid4()}@example.com", name="benchmark")
+    bots = [Bot(id=uuid.uuid4(), filename=name, original_filename=name, uploader_id=user.id)
+            for name in write_fast_bots(directory, 2)]
+    db.add(user)
+    db.flush()
+    db.add_all(bots)
+    db.commit()
+    user_id, bot_ids = user.id, [str(bot.id) for bot in bots]
+
+    v2 = APIRouter(prefix="/v2")
+    v2.include_router(matches.router)
+    app = FastAPI()
+    app.include_router(v2)
+    app.dependency_overrides[require_user] = lambda: User(id=user_id)
+    params = {"bot1_id": bot_ids[0], "bot2_id": bot_ids[1], "rounds": rounds}
+
+    def post():
+        started = time.perf_counter()
+        response = client.post("/v2/matches/", params=params)
+        elapsed = time.perf_counter() - started
+        response.raise_for_status()
+        return elapsed
+
+    try:
+        with TestClient(app) as client:
+            # TestClient runs background tasks before post() returns, so with the embedded
+            # worker on the timing covers the whole match
+            jobs.EMBEDDED_WORKER = False
+            queued = [post() for _ in range(requests)]
+            db.query(Job).filter(Job.target_id.in_(
+                db.query(Match.id).filter(Match.creator_id == user_id))).delete(synchronize_session=False)
+            db.commit()
+            jobs.EMBEDDED_WORKER = True
+            played = [post() for _ in range(requests)]
+        completed = db.query(Match).filter(Match.creator_id == user_id, Match.status == "completed").count()
+    finally:
+        player.uploads_dir, jobs.uploads_dir, jobs.EMBEDDED_WORKER, match_cache.MATCH_CACHE_SIZE = saved
+        shutil.rmtree(directory, ignore_errors=True)
+        db.rollback()
+        match_ids = db.query(Match.id).filter(Match.creator_id == user_id)
+        db.query(Job).filter(Job.target_id.in_(match_ids)).delete(synchronize_session=False)
+        db.query(Match).filter(Match.creator_id == user_id).delete(synchronize_session=False)
+        # Played matches add the bots' daily latency rows, which reference them
+        bench_bot_ids = db.query(Bot.id).filter(Bot.uploader_id == user_id)
+        db.query(BotLatencyDaily).filter(BotLatencyDaily.bot_id.in_(bench_bot_ids)).delete(synchronize_session=False)
+        db.query(Bot).filter(Bot.uploader_id == user_id).delete(synchronize_session=False)
+        db.query(User).filter(User.id == user_id).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+    result = {"benchmark": "post_match", "requests": requests, "rounds": rounds, "completed": completed}
+    result.update(summarize("api_ms", queued))
+    result.update(summarize("end_to_end_ms", played))
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=1, help="games per match")
+    args = parser.parse_args()
+    result = run(args.requests, args.rounds)
+    if "skipped" in result:
+        print(f"skipped: {result['skipped']}")
+    else:
+        print(f"POST /v2/matches:  {result['api_ms_mean']:8.2f} ms mean  {result['api_ms_p50']:8.2f} ms p50")
+        print(f"  until completed: {result['end_to_end_ms_mean']:8.2f} ms mean  {result['end_to_end_ms_p50']:8.2f} ms p50"
+              f"  ({result['completed']}/{result['requests']} completed)")
@@ -0,0 +1,140 @@
+"""
+Benchmark: start_game per-move latency for each bot mode, and the cost of
+applying one shot to the boards.
+
+Games are played between two synthetic fast bots (see fast_bots.py), so the
+per-move figure is the engine's overhead plus the runner's round trip, not the
+bots' thinking time. `engine_us_per_move` leaves out the time spent waiting on
+the bots.
+
+    python benchmarks/bench_engine.py [--games N] [--modes session,subprocess,...] [--apply-games N]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from engine import CELLS, MISS, SUNK
+from fast_bots import write_fast_bots
+import player
+from player import Player, start_game
+from bench_serialization import mid_game_player
+
+BOT_MODES = ("inprocess", "forkserver", "session", "subprocess")
+
+
+def time_calls(runner, waited):
+    """
+    Wraps a bot runner's calls so the time spent in them is added to waited[0].
+    """
+    for name in ("initialize", "next_move", "next_move_delta"):
+        method = getattr(runner, name, None)
+        if method is None:
+            continue
+
+        def timed(*args, _method=method, **kwargs):
+            started = time.perf_counter()
+            try:
+                return _method(*args, **kwargs)
+            finally:
+                waited[0] += time.perf_counter() - started
+        setattr(runner, name, timed)
+
+
+def run_start_game(games=5, mode="session"):
+    """
+    Plays `games` games between two fast bots in one bot mode.
+    :param mode: A bot_runner mode; "inprocess" runs the bots as trusted bots.
+    :return: A result dictionary.
+    """
+    directory = tempfile.mkdtemp(prefix="battleship_bench_")
+    uploads_dir = player.uploads_dir
+    player.uploads_dir = directory
+    try:
+        bot1, bot2 = write_fast_bots(directory, 2)
+        player1 = Player(bot1[:-3], mode)
+        player2 = Player(bot2[:-3], mode)
+        waited = [0.0]
+        time_calls(player1.runner(), waited)
+        time_calls(player2.runner(), waited)
+        moves = 0
+        started = time.perf_counter()
+        try:
+            for game in range(games):
+                records = []
+                start_game(player1, player2, seed=game, records=records)
+                moves += len(records[0].shots) if records else 0
+        finally:
+            player1.close()
+            player2.close()
+        elapsed = time.perf_counter() - started
+    finally:
+        player.uploads_dir = uploads_dir
+        shutil.rmtree(directory, ignore_errors=True)
+    return {
+        "benchmark": f"start_game[{mode}]",
+        "games": games,
+        "moves": moves,
+        "us_per_move": elapsed / moves * 1e6,
+        "engine_us_per_move": (elapsed - waited[0]) / moves * 1e6,
+        "seconds_per_game": elapsed / games,
+    }
+
+
+def run_apply_move(games=2000):
+    """
+    Times the work apply_move does for one shot: resolving it against the opponent's
+    bitboards, marking the attacker's, and updating ship health. Every game fires at all
+    100 cells of a freshly placed board in random order.
+    :return: A result dictionary.
+    """
+    rng = random.Random(0)
+    orders = [rng.sample(range(CELLS), CELLS) for _ in range(16)]
+    attacker = mid_game_player(0)
+
+    def play(order):
+        target = mid_game_player(0)
+        ships = target.ships
+        names = target.board.ship_names
+        for cell in order:
+            result, ship = target.board.receive(cell)
+            attacker.board.record_shot(cell, result != MISS)
+            if result != MISS:
+                ships[names[ship]]["health"] -= 1
+                if result == SUNK:
+                    target.remaining_ships -= 1
+
+    # Best of five runs, with the cost of placing the fleets taken out
+    setup = min(timeit.repeat(lambda: mid_game_player(0), number=games, repeat=5))
+    total = min(timeit.repeat(lambda: play(orders[rng.randrange(len(orders))]), number=games, repeat=5))
+    return {
+        "benchmark": "apply_move",
+        "shots": games * CELLS,
+        "us_per_move": max(total - setup, 0.0) / (games * CELLS) * 1e6,
+    }
+
+
+def run(games=5, modes=BOT_MODES, apply_games=2000):
+    """
+    :return: A list of result dictionaries: one per bot mode, then apply_move.
+    """
+    results = [run_start_game(games, mode) for mode in modes]
+    results.append(run_apply_move(apply_games))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--games", type=int, default=5)
+    parser.add_argument("--modes", default=",".join(BOT_MODES))
+    parser.add_argument("--apply-games", type=int, default=2000, help="apply_move games of 100 shots each")
+    args = parser.parse_args()
+    for result in run(args.games, args.modes.split(","), args.apply_games):
+        print(f"{result['benchmark']:24} {result['us_per_move']:10.2f} us/move")
@@ -0,0 +1,88 @@
+"""
+Micro-benchmark: cost of producing a bot's input grids once per turn.
+
+Compares the original grid_to_string, which rebuilt both strings from the
+dict-of-lists grids with `+=`, against the engine's incremental byte views.
+
+    python benchmarks/bench_serialization.py [--turns N]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import SIZE, cell_index
+from player import Player
+
+FLEET_TEXT = "Carrier,A1,A2,A3,A4,A5\nBattleship,B2,C2,D2,E2\nCruiser,C3,D3,E3\nSubmarine,D6,E6,F6\nDestroyer,E7,E8"
+
+
+def legacy_grid_to_string(attack_grid, ship_grid):
+    """
+    The per-turn serialization start_game used before the byte views.
+    """
+    attack_grid_str = ""
+    ship_grid_str = ""
+    for row in sorted(attack_grid.keys()):
+        for cell in attack_grid[row]:
+            if cell is None:
+                attack_grid_str += "~"
+            elif cell == 'H':
+                attack_grid_str += "H"
+            elif cell == 'M':
+                attack_grid_str += "M"
+        attack_grid_str += "\n"
+    for row in sorted(ship_grid.keys()):
+        for cell in ship_grid[row]:
+            if cell is None:
+                ship_grid_str += "~"
+            else:
+                ship_grid_str += cell
+        ship_grid_str += "\n"
+    return attack_grid_str.strip(), ship_grid_str.strip()
+
+
+def mid_game_player(shots):
+    """
+    :return: A Player with a placed fleet that has fired `shots` shots at itself.
+    """
+    player = Player("bench")
+    for index, line in enumerate(FLEET_TEXT.splitlines()):
+        coords = line.split(',')[1:]
+        player.board.place(index, [cell_index(c[0], int(c[1:])) for c in coords])
+    cells = list(range(SIZE * SIZE))
+    random.Random(0).shuffle(cells)
+    for cell in cells[:shots]:
+        result, _ = player.board.receive(cell)
+        player.board.record_shot(cell, result != 0)
+    return player
+
+
+def run(turns=20000, shots=50):
+    player = mid_game_player(shots)
+    attack_grid, ship_grid = player.attack_grid, player.ship_grid
+    board = player.board
+    assert legacy_grid_to_string(attack_grid, ship_grid) == (board.attack_string(), board.ship_string())
+
+    legacy = timeit.timeit(lambda: legacy_grid_to_string(attack_grid, ship_grid), number=turns)
+    incremental = timeit.timeit(lambda: (board.attack_string(), board.ship_string()), number=turns)
+    return {
+        "benchmark": "grid_to_string",
+        "turns": turns,
+        "legacy_us_per_turn": legacy / turns * 1e6,
+        "incremental_us_per_turn": incremental / turns * 1e6,
+        "speedup": legacy / incremental,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=20000)
+    args = parser.parse_args()
+    result = run(args.turns)
+    print(f"legacy grid_to_string: {result['legacy_us_per_turn']:.2f} us/turn")
+    print(f"incremental views:     {result['incremental_us_per_turn']:.2f} us/turn")
+    print(f"speedup:               {result['speedup']:.1f}x")
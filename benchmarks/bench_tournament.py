@@ -0,0 +1,78 @@
+"""
+Benchmark: games per second of a run_tournament round robin as the field grows.
+
+Every size plays a full round robin of synthetic fast bots (see fast_bots.py),
+so n bots play n * (n - 1) / 2 pairings of --games games each.
+
+    python benchmarks/bench_tournament.py [--sizes 2,4,8,16,32,64] [--games N] [--mode session] [--workers N]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bot_runner
+import player
+from fast_bots import write_fast_bots
+from tournament import TOURNAMENT_WORKERS, run_tournament
+
+SIZES = (2, 4, 8, 16, 32, 64)
+
+
+def run_size(size, games=1, mode=None, workers=None):
+    """
+    Plays one round robin of `size` fast bots.
+    :param mode: Bot mode for every bot; defaults to BOT_MODE. "inprocess" runs them as trusted bots.
+    :param workers: Worker processes; defaults to TOURNAMENT_WORKERS.
+    :return: A result dictionary.
+    """
+    mode = mode or bot_runner.BOT_MODE
+    workers = workers or TOURNAMENT_WORKERS
+    directory = tempfile.mkdtemp(prefix="battleship_bench_")
+    uploads_dir, bot_mode = player.uploads_dir, bot_runner.BOT_MODE
+    # Worker processes are forked, so they see both settings too
+    player.uploads_dir = directory
+    if mode != "inprocess":
+        bot_runner.BOT_MODE = mode
+    try:
+        bot_files = write_fast_bots(directory, size)
+        trusted = bot_files if mode == "inprocess" else ()
+        started = time.perf_counter()
+        run_tournament(bot_files, games, workers=workers, trusted=trusted)
+        elapsed = time.perf_counter() - started
+    finally:
+        player.uploads_dir, bot_runner.BOT_MODE = uploads_dir, bot_mode
+        shutil.rmtree(directory, ignore_errors=True)
+    played = size * (size - 1) // 2 * games
+    return {
+        "benchmark": f"round_robin[{size}]",
+        "bots": size,
+        "mode": mode,
+        "workers": workers,
+        "games": played,
+        "seconds": elapsed,
+        "games_per_second": played / elapsed,
+    }
+
+
+def run(sizes=SIZES, games=1, mode=None, workers=None):
+    """
+    :return: A list of result dictionaries, one per field size.
+    """
+    return [run_size(size, games, mode, workers) for size in sizes]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(str(size) for size in SIZES))
+    parser.add_argument("--games", type=int, default=1, help="games per pairing")
+    parser.add_argument("--mode", default=None, help="bot mode; defaults to BOT_MODE")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    for result in run([int(size) for size in args.sizes.split(",")], args.games, args.mode, args.workers):
+        print(f"{result['bots']:3} bots  {result['games']:5} games  {result['games_per_second']:8.1f} games/s")
@@ -0,0 +1,39 @@
+"""
+Synthetic bots for the benchmarks.
+
+Each bot places the same fleet and fires at the first cell it has not tried yet,
+walking the board from its own starting offset. They answer in microseconds, so
+a benchmark using them measures the engine and the bot runners rather than the
+bots. Every bot file is different, so placement caching and bytecode caching
+treat them as separate bots, as they would real uploads.
+"""
+import os
+
+FAST_BOT_TEMPLATE = '''import sys
+ROWS = "ABCDEFGHIJ"
+OFFSET = {offset}
+ORDER = [ROWS[(i + OFFSET) % 100 // 10] + str((i + OFFSET) % 10 + 1) for i in range(100)]
+SHIPS = "Carrier,A1,A2,A3,A4,A5\\nBattleship,B2,C2,D2,E2\\nCruiser,C3,D3,E3\\nSubmarine,D6,E6,F6\\nDestroyer,E7,E8"
+if sys.argv[1] == "initialize":
+    print(SHIPS)
+else:
+    done = set(sys.argv[3].split(" "))
+    print(next(move for move in ORDER if move not in done))
+'''
+
+
+def write_fast_bots(directory, count, prefix="bench_fast"):
+    """
+    Writes `count` synthetic bots into a directory.
+    :param directory: Directory the engine loads bots from (player.uploads_dir).
+    :param count: Number of bots to write.
+    :param prefix: File name prefix; bots are named <prefix>_<n>.py.
+    :return: The bot file names, in order.
+    """
+    files = []
+    for index in range(count):
+        name = f"{prefix}_{index}.py"
+        with open(os.path.join(directory, name), "w") as f:
+            f.write(FAST_BOT_TEMPLATE.format(offset=index * 7))
+        files.append(name)
+    return files
@@ -0,0 +1,117 @@
+"""
+Runs every benchmark and writes the results as JSON, optionally checking them
+against an earlier run.
+
+The output holds the environment the numbers were taken in (commit, Python,
+CPU count, BOT_MODE) and one entry per benchmark, each with a "benchmark" name.
+With --baseline, every timing that got worse by more than --tolerance is listed
+and the exit status is 1, so a regression fails a CI job.
+
+    python benchmarks/run_all.py [--output results.json] [--baseline old.json] [--tolerance 0.2] [--quick]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_ai_bots
+import bench_api
+import bench_engine
+import bench_serialization
+import bench_tournament
+import bot_runner
+
+# Keys ending like these are timings (lower is better) or rates (higher is better); other keys are not compared
+LOWER_IS_BETTER = ("_us_per_turn", "us_per_move", "_mean", "_p50", "seconds_per_game")
+HIGHER_IS_BETTER = ("games_per_second", "speedup")
+
+
+def environment():
+    """
+    :return: What the results depend on besides the code.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "bot_mode": bot_runner.BOT_MODE,
+        "started_at": datetime.utcnow().isoformat(),
+    }
+
+
+def run(quick=False):
+    """
+    :param quick: Smaller runs for a fast check: fewer games, and round robins of at most 16 bots.
+    :return: A list of result dictionaries.
+    """
+    results = [bench_serialization.run(2000 if quick else 20000)]
+    results += bench_engine.run(2 if quick else 5)
+    results += bench_tournament.run((2, 4, 8, 16) if quick else bench_tournament.SIZES)
+    results.append(bench_api.run(5 if quick else 20))
+    results += bench_ai_bots.run(1 if quick else 3)
+    return results
+
+
+def regressions(results, baseline, tolerance):
+    """
+    Compares results with an earlier run's.
+    :param results: The new list of result dictionaries.
+    :param baseline: The earlier list of result dictionaries.
+    :param tolerance: Relative change allowed before a metric counts as a regression, e.g. 0.2.
+    :return: A list of (benchmark, metric, old value, new value) tuples that regressed.
+    """
+    old = {result["benchmark"]: result for result in baseline}
+    found = []
+    for result in results:
+        previous = old.get(result["benchmark"])
+        if previous is None:
+            continue
+        for metric, value in result.items():
+            before = previous.get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(before, (int, float)) or before <= 0:
+                continue
+            if metric.endswith(LOWER_IS_BETTER) and value > before * (1 + tolerance):
+                found.append((result["benchmark"], metric, before, value))
+            elif metric.endswith(HIGHER_IS_BETTER) and value < before * (1 - tolerance):
+                found.append((result["benchmark"], metric, before, value))
+    return found
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default=None, help="results file of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--quick", action="store_true")
+    args = parser.parse_args()
+
+    results = run(args.quick)
+    with open(args.output, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+    for result in results:
+        if "skipped" in result:
+            print(f"{result['benchmark']:24} skipped: {result['skipped']}")
+        else:
+            print(f"{result['benchmark']:24} " + "  ".join(
+                f"{metric}={value:.2f}" for metric, value in result.items()
+                if metric.endswith(LOWER_IS_BETTER + HIGHER_IS_BETTER)))
+    print(f"results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f)["results"], args.tolerance)
+        for benchmark, metric, before, value in found:
+            print(f"REGRESSION {benchmark} {metric}: {before:.2f} -> {value:.2f}")
+        sys.exit(1 if found else 0)
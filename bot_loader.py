@@ -0,0 +1,171 @@
+"""
+Compiled-bytecode cache and loader for bot scripts.
+
+Scripts run as __main__ are never cached as .pyc, so every engine call used to
+recompile the bot from source. Instead, a bot's code object is compiled once,
+at upload time or on its first run, and stored by the SHA-256 of its source:
+
+    <BYTECODE_DIR>/<sha256>.<cache tag>.bin    (importlib magic number + marshal data)
+
+Editing or re-uploading a bot changes its hash, so a stale entry is never used.
+The loader runs the cached code exactly like `python <script> <args>` would:
+
+    python bot_loader.py <bot_script> [args...]
+
+The runners, bot_shim.py and forkserver.py use run_path() from here in place of
+runpy.run_path().
+
+When the engine passes a seed for a call (BATTLESHIP_SEED in the environment for
+this loader), seed_bot() seeds `random`, and numpy if it is already imported,
+before the bot runs, so a bot using them plays the same game again for the same seed.
+"""
+import builtins
+import hashlib
+import importlib.util
+import marshal
+import os
+import sys
+import types
+
+BYTECODE_DIR = os.getenv("BYTECODE_DIR", os.path.join("uploads", "__bytecode__"))
+
+# Environment variable bots can read their seed for the current call from
+SEED_ENV = "BATTLESHIP_SEED"
+
+
+def compile_source(source, filename):
+    """
+    Compiles a bot's source the way the interpreter would compile a script.
+    :param source: The file contents as bytes.
+    :param filename: Name shown in tracebacks.
+    :return: The module code object.
+    :raises SyntaxError: If the source is not valid Python.
+    :raises ValueError: If the source contains null bytes.
+    """
+    return compile(source, filename, "exec", dont_inherit=True)
+
+
+def cache_path(digest):
+    return os.path.join(BYTECODE_DIR, f"{digest}.{sys.implementation.cache_tag}.bin")
+
+
+def store(digest, code):
+    """
+    Writes a code object to the cache. The file is replaced atomically, so
+    concurrent readers never see a partial entry.
+    """
+    import tempfile  # Only needed on a cache miss; keeps loader startup small
+    os.makedirs(BYTECODE_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=BYTECODE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(importlib.util.MAGIC_NUMBER)
+            marshal.dump(code, f)
+        os.replace(temp_path, cache_path(digest))
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def fetch(digest):
+    """
+    :return: The cached code object for a source hash, or None if it is missing or
+             was written by a different Python version.
+    """
+    try:
+        with open(cache_path(digest), "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    magic = importlib.util.MAGIC_NUMBER
+    if not data.startswith(magic):
+        return None
+    try:
+        return marshal.loads(data[len(magic):])
+    except (EOFError, ValueError, TypeError):
+        return None
+
+
+def compile_bot(source, filename):
+    """
+    Validates a bot's source and caches its compiled code.
+    :return: The SHA-256 hex digest of the source.
+    :raises SyntaxError, ValueError: If the source does not compile.
+    """
+    code = compile_source(source, filename)
+    digest = hashlib.sha256(source).hexdigest()
+    store(digest, code)
+    return digest
+
+
+def load_code(script_path):
+    """
+    :return: The code object for a bot script, compiled and cached on a miss.
+    """
+    with open(script_path, "rb") as f:
+        source = f.read()
+    digest = hashlib.sha256(source).hexdigest()
+    code = fetch(digest)
+    if code is None:
+        code = compile_source(source, script_path)
+        try:
+            store(digest, code)
+        except OSError:
+            pass  # Read-only cache; just run without one
+    return code
+
+
+def seed_bot(seed):
+    """
+    Makes the next bot call reproducible: exports the seed as BATTLESHIP_SEED and seeds
+    `random`, and numpy if it is loaded.
+    :param seed: An integer below 2**32.
+    """
+    import random  # Only needed when seeding; keeps loader startup small
+    os.environ[SEED_ENV] = str(seed)
+    random.seed(seed)
+    if "numpy.random" in sys.modules:
+        sys.modules["numpy"].random.seed(seed)
+
+
+def run_path(script_path, run_name="__main__"):
+    """
+    Executes a bot script from cached bytecode, like runpy.run_path().
+    :param run_name: The `__name__` the script sees.
+    :return: The script's globals after it ran.
+    """
+    code = load_code(script_path)
+    module = types.ModuleType(run_name)
+    module.__dict__.update({
+        "__file__": script_path,
+        "__cached__": None,
+        "__loader__": None,
+        "__package__": None,
+        "__spec__": None,
+        "__builtins__": builtins,
+    })
+    # Like runpy, make the script importable as its run name while it runs
+    saved = sys.modules.get(run_name)
+    sys.modules[run_name] = module
+    try:
+        exec(code, module.__dict__)
+    finally:
+        if saved is None:
+            sys.modules.pop(run_name, None)
+        else:
+            sys.modules[run_name] = saved
+    return module.__dict__.copy()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python bot_loader.py <bot_script> [args...]", file=sys.stderr)
+        sys.exit(2)
+    script = sys.argv[1]
+    sys.argv = sys.argv[1:]
+    # Match `python bot.py`, where the bot's own directory is first on sys.path
+    sys.path[0] = os.path.dirname(os.path.abspath(script))
+    if os.environ.get(SEED_ENV):
+        seed_bot(int(os.environ[SEED_ENV]))
+    run_path(script)
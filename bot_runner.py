@@ -0,0 +1,615 @@
+import atexit
+import json
+import logging
+import multiprocessing
+import os
+import select
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from bot_loader import SEED_ENV
+from bot_shim import bot_capabilities, handle_request, load_module
+from placement import file_digest
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; bots then run without rlimits
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# How bots are executed when a Player does not ask for a specific mode:
+#   "subprocess" - spawn `python <bot>` for every initialize/move call (original behaviour)
+#   "session"    - start the bot once under bot_shim.py and talk to it over stdin/stdout
+#   "forkserver" - fork every initialize/move call from a preloaded forkserver.py process
+#   "inprocess"  - run the bot inside a process that only plays games, never the API
+#                  process; only for bots marked trusted, never used as the default
+BOT_MODE = os.getenv("BOT_MODE", "session")
+
+# Number of trusted bots whose loaded modules each worker process keeps
+INPROCESS_CACHE_SIZE = int(os.getenv("INPROCESS_CACHE_SIZE", "32"))
+
+SHIM_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot_shim.py")
+LOADER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot_loader.py")
+FORKSERVER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "forkserver.py")
+
+# Limits applied to every bot; 0 disables a limit
+BOT_MOVE_TIMEOUT = float(os.getenv("BOT_MOVE_TIMEOUT", "10"))     # seconds per initialize/move call
+BOT_GAME_TIMEOUT = float(os.getenv("BOT_GAME_TIMEOUT", "300"))    # seconds per bot per game
+BOT_CPU_SECONDS = int(os.getenv("BOT_CPU_SECONDS", "120"))        # CPU seconds per bot process
+BOT_MEMORY_MB = int(os.getenv("BOT_MEMORY_MB", "1024"))           # address space per bot process
+BOT_OUTPUT_LIMIT = int(os.getenv("BOT_OUTPUT_LIMIT", "65536"))    # bytes of output per call
+
+
+class BotLimitExceeded(Exception):
+    """
+    Raised when a bot runs out of time or prints too much. The bot's process has
+    already been killed; the game treats this as a forfeit.
+    """
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason  # "timeout" or "output_limit"
+
+
+def limit_resources():
+    """
+    Runs in the bot's child process before it starts and applies the CPU and memory rlimits.
+    """
+    if BOT_CPU_SECONDS > 0:
+        resource.setrlimit(resource.RLIMIT_CPU, (BOT_CPU_SECONDS, BOT_CPU_SECONDS + 1))
+    if BOT_MEMORY_MB > 0:
+        limit = BOT_MEMORY_MB * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def sandbox_options():
+    """
+    :return: Popen keyword arguments that limit a bot process. It gets its own process
+             group, so killing it also kills anything it spawned.
+    """
+    return {
+        "start_new_session": True,
+        "preexec_fn": limit_resources if resource is not None else None,
+    }
+
+
+def kill_process(process):
+    """
+    Kills a bot process and its process group and reaps it.
+    """
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (OSError, AttributeError):
+        try:
+            process.kill()
+        except OSError:
+            pass
+    process.wait()
+
+
+def read_limited(stream, timeout, limit, line=False):
+    """
+    Reads a bot's output without waiting past a deadline or buffering without bound.
+    :param stream: The process's binary stdout pipe.
+    :param timeout: Seconds allowed, or None to wait indefinitely.
+    :param limit: Maximum number of bytes accepted, or 0 for no limit.
+    :param line: Return at the first newline instead of at end of file.
+    :return: The bytes read.
+    :raises BotLimitExceeded: If the deadline passes or more than `limit` bytes arrive.
+    """
+    fd = stream.fileno()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    data = bytearray()
+    while True:
+        remaining = None
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise BotLimitExceeded("timeout", f"no answer within {timeout:.1f}s")
+        ready, _, _ = select.select([fd], [], [], remaining)
+        if not ready:
+            continue
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            return bytes(data)
+        data += chunk
+        if limit and len(data) > limit:
+            raise BotLimitExceeded("output_limit", f"printed more than {limit} bytes")
+        if line and b"\n" in chunk:
+            return bytes(data)
+
+
+def call_timeout(timeout):
+    """
+    :param timeout: An explicit timeout in seconds, or None for BOT_MOVE_TIMEOUT.
+    :return: The timeout to apply, or None for no limit.
+    """
+    if timeout is None:
+        timeout = BOT_MOVE_TIMEOUT
+    return timeout if timeout > 0 else None
+
+
+class SubprocessBot:
+    """
+    Runs the bot script as a fresh interpreter for every call.
+    A fresh process cannot remember earlier turns, so it always gets the full state.
+    """
+    supports_delta = False
+
+    def __init__(self, script_path):
+        self.script_path = script_path
+        self.seed = None  # Seed for the next call, set by the engine
+
+    def _run(self, args, timeout=None):
+        env = None
+        if self.seed is not None:
+            env = dict(os.environ, **{SEED_ENV: str(self.seed)})
+        process = subprocess.Popen(
+            ['python', LOADER_PATH, self.script_path] + args,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=env,
+            **sandbox_options()
+        )
+        try:
+            output = read_limited(process.stdout, call_timeout(timeout), BOT_OUTPUT_LIMIT)
+            # Closing stdout is not exiting; do not let the bot linger in the background
+            process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            pass
+        finally:
+            if process.poll() is None:
+                kill_process(process)
+            process.stdout.close()
+        return output.decode("utf-8", errors="replace")
+
+    def initialize(self, timeout=None):
+        """
+        :param timeout: Seconds allowed for the call; defaults to BOT_MOVE_TIMEOUT.
+        :return: Everything the bot printed for `initialize`.
+        :raises BotLimitExceeded: If the bot ran out of time or printed too much.
+        """
+        return self._run(['initialize'], timeout)
+
+    def next_move(self, ship_grid, attack_grid, moves, timeout=None):
+        """
+        :param ship_grid: The player's ship grid as a string.
+        :param attack_grid: The player's attack grid as a string.
+        :param moves: Space separated list of the player's previous moves.
+        :param timeout: Seconds allowed for the call; defaults to BOT_MOVE_TIMEOUT.
+        :return: Everything the bot printed for this move.
+        :raises BotLimitExceeded: If the bot ran out of time or printed too much.
+        """
+        return self._run([ship_grid, attack_grid, moves], timeout)
+
+    def close(self):
+        pass
+
+
+class SessionBot:
+    """
+    Keeps one bot process alive for a whole game or series.
+    The process runs bot_shim.py, which answers line-delimited JSON requests and
+    executes argv-style bots unchanged, so no bot has to be rewritten.
+    """
+    def __init__(self, script_path):
+        self.script_path = script_path
+        self.process = None
+        self.capabilities = bot_capabilities(script_path)
+        self.seed = None  # Seed for the next call, set by the engine
+
+    @property
+    def supports_delta(self):
+        """
+        True if the bot declared the "delta" capability and can be sent only what changed.
+        """
+        return "delta" in self.capabilities
+
+    def start(self):
+        self.process = subprocess.Popen(
+            ['python', SHIM_PATH, self.script_path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            # The shim points the bot's stdout at stderr; discard both, like subprocess mode
+            stderr=subprocess.DEVNULL,
+            bufsize=0,
+            **sandbox_options()
+        )
+
+    def _request(self, payload, timeout=None):
+        """
+        Sends one request to the bot process and waits for its response.
+        :param payload: The request dictionary.
+        :param timeout: Seconds allowed for the answer; defaults to BOT_MOVE_TIMEOUT.
+        :return: The bot's output, or an empty string if the bot failed.
+        :raises BotLimitExceeded: If the bot ran out of time or printed too much; the process is killed.
+        """
+        if self.process is None or self.process.poll() is not None:
+            self.start()
+        if self.seed is not None:
+            payload["seed"] = self.seed
+        try:
+            self.process.stdin.write((json.dumps(payload) + "\n").encode())
+            line = read_limited(self.process.stdout, call_timeout(timeout), BOT_OUTPUT_LIMIT, line=True)
+        except BotLimitExceeded as e:
+            logger.warning(f"Bot session for '{self.script_path}' killed: {e}")
+            self.kill()
+            raise
+        except (BrokenPipeError, OSError) as e:
+            logger.warning(f"Bot session for '{self.script_path}' failed: {e}")
+            self.close()
+            return ""
+        if not line:
+            logger.warning(f"Bot session for '{self.script_path}' exited unexpectedly")
+            self.close()
+            return ""
+        try:
+            response = json.loads(line)
+        except ValueError:
+            logger.warning(f"Bot session for '{self.script_path}' sent a malformed response")
+            self.close()
+            return ""
+        if not response.get("ok"):
+            logger.info(f"'{self.script_path}' failed: {response.get('error')}")
+        return response.get("output", "")
+
+    def initialize(self, timeout=None):
+        return self._request({"cmd": "initialize"}, timeout)
+
+    def next_move(self, ship_grid, attack_grid, moves, timeout=None):
+        return self._request({"cmd": "move", "ship_grid": ship_grid, "attack_grid": attack_grid, "moves": moves}, timeout)
+
+    def next_move_delta(self, delta, timeout=None):
+        """
+        :param delta: The bot's previous shot and its result, plus the opponent's last shot.
+        :param timeout: Seconds allowed for the call; defaults to BOT_MOVE_TIMEOUT.
+        :return: Everything the bot answered for this move.
+        """
+        return self._request({"cmd": "move", "delta": delta}, timeout)
+
+    def kill(self):
+        """
+        Kills the bot process without asking; the next request starts a new one.
+        """
+        if self.process is None:
+            return
+        process, self.process = self.process, None
+        kill_process(process)
+        process.stdin.close()
+        process.stdout.close()
+
+    def close(self):
+        """
+        Asks the bot process to exit, killing it if it does not.
+        """
+        if self.process is None:
+            return
+        process, self.process = self.process, None
+        try:
+            if process.poll() is None:
+                process.stdin.write((json.dumps({"cmd": "quit"}) + "\n").encode())
+            process.stdin.close()
+            process.wait(timeout=1)
+        except (OSError, subprocess.TimeoutExpired):
+            kill_process(process)
+        finally:
+            process.stdout.close()
+
+
+class ForkServer:
+    """
+    Starts and tracks this process's forkserver.py, which forks bot invocations on request.
+    """
+    def __init__(self):
+        self.process = None
+        self.directory = None
+        self.socket_path = None
+        self.owner = None
+        self.lock = threading.Lock()
+
+    def running(self):
+        # A forked engine worker must not reuse its parent's server handle
+        return self.process is not None and self.owner == os.getpid() and self.process.poll() is None
+
+    def start(self):
+        self.directory = tempfile.mkdtemp(prefix="battleship-forkserver-")
+        self.socket_path = os.path.join(self.directory, "server.sock")
+        self.owner = os.getpid()
+        # The server exits when its stdin closes, so it never outlives the engine
+        self.process = subprocess.Popen(
+            ['python', FORKSERVER_PATH, self.socket_path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        if self.process.stdout.readline().strip() != b"ready":
+            self.stop()
+            raise RuntimeError("forkserver failed to start")
+
+    def connect(self):
+        """
+        :return: A socket connected to the server, starting the server first if needed.
+        """
+        with self.lock:
+            if not self.running():
+                self.start()
+            socket_path = self.socket_path
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(socket_path)
+        return conn
+
+    def stop(self):
+        if self.process is not None and self.owner == os.getpid():
+            self.process.stdin.close()
+            try:
+                self.process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process.stdout.close()
+            shutil.rmtree(self.directory, ignore_errors=True)
+        self.process = None
+
+
+fork_server = ForkServer()
+atexit.register(fork_server.stop)
+
+
+class ForkServerBot:
+    """
+    Runs the bot script as a fresh child for every call, like SubprocessBot, but the
+    child is forked from a server that already paid interpreter startup and imports.
+    """
+    supports_delta = False
+
+    def __init__(self, script_path):
+        self.script_path = script_path
+        self.seed = None  # Seed for the next call, set by the engine
+
+    def _run(self, args, timeout=None):
+        timeout = call_timeout(timeout)
+        started = time.monotonic()
+        conn = fork_server.connect()
+        pid = None
+        try:
+            request = {"script": self.script_path, "args": args, "seed": self.seed}
+            conn.sendall((json.dumps(request) + "\n").encode())
+            # The child announces its pid first so it can be killed on a timeout
+            header = read_limited(conn, timeout, 0, line=True)
+            pid_line, _, output = header.partition(b"\n")
+            if not pid_line:
+                return ""
+            pid = int(pid_line)
+            if timeout is not None:
+                timeout = max(timeout - (time.monotonic() - started), 0.001)
+            limit = BOT_OUTPUT_LIMIT - len(output) if BOT_OUTPUT_LIMIT else 0
+            if limit < 0:
+                raise BotLimitExceeded("output_limit", f"printed more than {BOT_OUTPUT_LIMIT} bytes")
+            output += read_limited(conn, timeout, limit)
+        except BotLimitExceeded:
+            if pid is not None:
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except OSError:
+                    pass
+            raise
+        finally:
+            conn.close()
+        return output.decode("utf-8", errors="replace")
+
+    def initialize(self, timeout=None):
+        return self._run(['initialize'], timeout)
+
+    def next_move(self, ship_grid, attack_grid, moves, timeout=None):
+        return self._run([ship_grid, attack_grid, moves], timeout)
+
+    def close(self):
+        pass
+
+
+class ModuleCache:
+    """
+    LRU cache of delta bot modules loaded into this process, keyed by the bot file's SHA-256.
+    A loaded module is checked out by one runner at a time, so a bot playing itself gets
+    two copies with separate globals.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()  # digest -> idle module globals
+        self.lock = threading.Lock()
+
+    def acquire(self, script_path):
+        """
+        :return: A tuple (digest, module) with an idle copy of the bot, loaded if none is
+                 cached. module is None if the bot failed to load.
+        """
+        digest = file_digest(script_path)
+        with self.lock:
+            idle = self.entries.get(digest)
+            if idle:
+                self.entries.move_to_end(digest)
+                return digest, idle.pop()
+        return digest, load_module(script_path)
+
+    def release(self, digest, module):
+        """
+        Returns a module to the cache, evicting the least recently used bots beyond max_size.
+        """
+        if module is None or self.max_size <= 0:
+            return
+        with self.lock:
+            self.entries.setdefault(digest, []).append(module)
+            self.entries.move_to_end(digest)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+module_cache = ModuleCache(INPROCESS_CACHE_SIZE)
+
+# Bots running in-process share sys.argv, sys.stdout and the import system
+_inprocess_lock = threading.Lock()
+
+# True in processes that only play games: tournament pool workers and the trusted bot process.
+# Trusted bots swap sys.stdout and sys.argv and reseed `random` for the whole process, so
+# anywhere else (the API, a job worker's threads) they run in the trusted bot process instead
+_bot_process = False
+
+_trusted_pool = None
+_trusted_pool_lock = threading.Lock()
+
+# Delta bot modules checked out by InProcessBot runners in this process, keyed by runner handle
+_checked_out = {}
+
+
+def enter_bot_process():
+    """
+    Marks this process as one that only plays games, so trusted bots run in it directly.
+    Used as the initializer of game worker pools.
+    """
+    global _bot_process
+    _bot_process = True
+
+
+def trusted_pool():
+    """
+    :return: The single-process pool trusted bots run in when this process is not a bot process.
+             It is started from a clean forkserver process on first use.
+    """
+    global _trusted_pool
+    with _trusted_pool_lock:
+        if _trusted_pool is None:
+            _trusted_pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("forkserver"),
+                                                initializer=enter_bot_process)
+        return _trusted_pool
+
+
+def _reset_trusted_pool(pool):
+    global _trusted_pool
+    with _trusted_pool_lock:
+        if _trusted_pool is pool:
+            _trusted_pool = None
+    pool.shutdown(wait=False)
+
+
+def _check_out(handle, script_path):
+    """
+    Loads a delta bot for one runner. Runs in the process the bot plays in.
+    :return: True if the bot loaded.
+    """
+    _checked_out[handle] = module_cache.acquire(script_path)
+    return _checked_out[handle][1] is not None
+
+
+def _check_in(handle):
+    digest, module = _checked_out.pop(handle, (None, None))
+    module_cache.release(digest, module)
+
+
+def _handle(handle, script_path, request):
+    """
+    Answers one request for a runner. Runs in the process the bot plays in.
+    """
+    if handle is not None and handle not in _checked_out:
+        # The trusted bot process was restarted since the runner checked its bot out
+        _check_out(handle, script_path)
+    module = _checked_out[handle][1] if handle is not None else None
+    with _inprocess_lock:
+        return handle_request(script_path, request, module)
+
+
+class InProcessBot:
+    """
+    Runs a trusted bot without a process of its own, with the same request handling as
+    bot_shim.py. Delta bots are loaded once and called through place_ships() and
+    next_move(state); argv-style bots are executed from cached bytecode on every call.
+    In a game worker process the bot runs in that process; anywhere else it runs in the
+    shared trusted bot process (see trusted_pool). Nothing can interrupt or limit the bot
+    there, so timeouts and rlimits do not apply: only use it for bots flagged as trusted.
+    """
+    def __init__(self, script_path):
+        self.script_path = script_path
+        self.capabilities = bot_capabilities(script_path)
+        self.seed = None  # Seed for the next call, set by the engine
+        self.local = _bot_process
+        self.handle = None
+        self.delta = False
+        if "delta" in self.capabilities:
+            self.handle = uuid.uuid4().hex
+            self.delta = bool(self._call(_check_out, self.handle, script_path))
+
+    @property
+    def supports_delta(self):
+        return self.delta
+
+    def _call(self, function, *args):
+        """
+        Runs one of the functions above where the bot plays.
+        :return: The function's result, or None if the trusted bot process died.
+        """
+        if self.local:
+            return function(*args)
+        pool = trusted_pool()
+        try:
+            return pool.submit(function, *args).result()
+        except BrokenProcessPool:
+            logger.error(f"The trusted bot process died while running '{self.script_path}'")
+            _reset_trusted_pool(pool)
+            return None
+
+    def _request(self, request):
+        request["seed"] = self.seed
+        response = self._call(_handle, self.handle, self.script_path, request) or {}
+        if not response.get("ok"):
+            logger.info(f"'{self.script_path}' failed: {response.get('error')}")
+        return response.get("output", "")
+
+    def initialize(self, timeout=None):
+        return self._request({"cmd": "initialize"})
+
+    def next_move(self, ship_grid, attack_grid, moves, timeout=None):
+        return self._request({"cmd": "move", "ship_grid": ship_grid, "attack_grid": attack_grid, "moves": moves})
+
+    def next_move_delta(self, delta, timeout=None):
+        return self._request({"cmd": "move", "delta": delta})
+
+    def close(self):
+        """
+        Hands the loaded module back to the cache for the next game or series.
+        """
+        handle, self.handle = self.handle, None
+        if handle is not None:
+            self._call(_check_in, handle)
+
+
+def make_bot(script_path, mode=None):
+    """
+    Creates the runner used to talk to a bot script.
+    :param script_path: Path to the bot's .py file.
+    :param mode: "subprocess", "session", "forkserver" or "inprocess"; defaults to BOT_MODE.
+                 "inprocess" must be asked for explicitly, for trusted bots only.
+    :return: A runner with initialize(), next_move() and close(), and a `seed` attribute the
+             engine sets before each call.
+    """
+    if mode is None and BOT_MODE == "inprocess":
+        raise ValueError("BOT_MODE=inprocess is not allowed; in-process mode is only chosen per trusted bot")
+    mode = mode or BOT_MODE
+    if mode == "subprocess":
+        return SubprocessBot(script_path)
+    if mode == "session":
+        return SessionBot(script_path)
+    if mode == "forkserver":
+        return ForkServerBot(script_path)
+    if mode == "inprocess":
+        return InProcessBot(script_path)
+    raise ValueError(f"Unknown bot mode '{mode}'")
@@ -0,0 +1,209 @@
+"""
+Compatibility shim that hosts a bot script inside one long-lived process.
+
+The engine starts `python bot_shim.py <bot_script>` once per game or series and
+then talks to it over stdin/stdout, one JSON request per line and one JSON
+response per line:
+
+    {"cmd": "initialize"}                                   -> {"ok": true, "output": "..."}
+    {"cmd": "move", "ship_grid": ..., "attack_grid": ...,
+     "moves": "A1 B2"}                                      -> {"ok": true, "output": "C3\\n"}
+    {"cmd": "quit"}                                         -> process exits
+
+Existing argv-style bots run unchanged: for every request the shim rebuilds
+sys.argv exactly like the old per-move subprocess call did, runs the script as
+__main__ from its cached bytecode (see bot_loader.py) and returns whatever it printed.
+
+Bots that declare the "delta" capability,
+
+    BATTLESHIP_CAPABILITIES = ["delta"]
+
+are imported once and kept in memory instead. They define `place_ships()`,
+returning the placement text, and `next_move(state)`, returning a move such as
+"B4". The engine then sends only what changed since the bot's last turn:
+
+    {"cmd": "move", "delta": {"turn": 7, "last_shot": "B3", "last_result": "hit",
+                              "sunk_ship": null, "opponent_shot": "E5"}}
+
+Any request may carry a "seed"; the shim then seeds the bot before the call
+(see bot_loader.seed_bot).
+
+`turn` counts the bot's own moves and restarts at 1 every game. Delta bots only
+receive deltas under BOT_MODE=session; in subprocess mode they are called with
+the legacy argv like any other bot, so they should keep an argv entry point.
+"""
+import ast
+import contextlib
+import io
+import json
+import os
+import sys
+from bot_loader import run_path, seed_bot
+
+
+def run_script(script_path, args):
+    """
+    Runs an argv-style bot script once and captures what it prints.
+    :param script_path: Path to the bot's .py file.
+    :param args: The argv list the bot would have received on the command line.
+    :return: A tuple (stdout, error) where error is None if the script ran cleanly.
+    """
+    buffer = io.StringIO()
+    error = None
+    saved_argv = sys.argv
+    sys.argv = [script_path] + list(args)
+    try:
+        with contextlib.redirect_stdout(buffer):
+            try:
+                run_path(script_path, run_name="__main__")
+            except SystemExit as e:
+                if e.code not in (None, 0):
+                    error = f"exited with status {e.code}"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        sys.argv = saved_argv
+    return buffer.getvalue(), error
+
+
+def bot_capabilities(script_path):
+    """
+    Reads a bot's declared capabilities without running it.
+    :param script_path: Path to the bot's .py file.
+    :return: A frozenset of capability names from its BATTLESHIP_CAPABILITIES assignment.
+    """
+    try:
+        with open(script_path, "r") as f:
+            tree = ast.parse(f.read())
+    except (OSError, SyntaxError, ValueError):
+        return frozenset()
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == "BATTLESHIP_CAPABILITIES" for target in node.targets
+        ):
+            try:
+                value = ast.literal_eval(node.value)
+            except ValueError:
+                return frozenset()
+            if isinstance(value, str):
+                value = [value]
+            return frozenset(str(item) for item in value)
+    return frozenset()
+
+
+def call_native(module, function, *args):
+    """
+    Calls a function of a bot kept in memory and captures its result like a print would.
+    :param module: The bot module's globals.
+    :param function: Name of the function to call.
+    :return: A tuple (stdout, error) where error is None if the call succeeded.
+    """
+    buffer = io.StringIO()
+    error = None
+    try:
+        with contextlib.redirect_stdout(buffer):
+            result = module[function](*args)
+    except (Exception, SystemExit) as e:
+        return buffer.getvalue(), f"{type(e).__name__}: {e}"
+    if result is None:
+        return buffer.getvalue(), error
+    return f"{result}\n", error
+
+
+def handle_request(script_path, request, module=None):
+    """
+    Turns a protocol request into the call the bot expects.
+    :param script_path: Path to the bot's .py file.
+    :param request: The decoded request dictionary.
+    :param module: The globals of a delta bot kept in memory, or None for argv-style bots.
+    :return: The response dictionary to send back to the engine.
+    """
+    cmd = request.get("cmd")
+    if request.get("seed") is not None:
+        seed_bot(request["seed"])
+    if module is not None and cmd == "initialize" and "place_ships" in module:
+        output, error = call_native(module, "place_ships")
+    elif module is not None and cmd == "move" and "delta" in request:
+        output, error = call_native(module, "next_move", request["delta"])
+    elif "delta" in request:
+        return {"ok": False, "output": "", "error": "bot does not support delta moves"}
+    else:
+        output, error = run_argv(script_path, request)
+        if output is None:
+            return {"ok": False, "output": "", "error": error}
+    response = {"ok": error is None, "output": output}
+    if error:
+        response["error"] = error
+    return response
+
+
+def run_argv(script_path, request):
+    """
+    Runs a request against the bot's argv entry point.
+    :return: A tuple (stdout, error); stdout is None for an unknown command.
+    """
+    cmd = request.get("cmd")
+    if cmd == "initialize":
+        args = ["initialize"]
+    elif cmd == "move":
+        args = [request.get("ship_grid", ""), request.get("attack_grid", ""), request.get("moves", "")]
+    else:
+        return None, f"unknown command '{cmd}'"
+    return run_script(script_path, args)
+
+
+def load_module(script_path):
+    """
+    Imports a delta bot once, without triggering its `__main__` block.
+    :return: The module's globals, or None if it failed to load.
+    """
+    saved_argv = sys.argv
+    sys.argv = [script_path]
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return run_path(script_path, run_name="__battleship_bot__")
+    except BaseException as e:
+        print(f"Could not load {script_path}: {type(e).__name__}: {e}", file=sys.stderr)
+        return None
+    finally:
+        sys.argv = saved_argv
+
+
+def serve(script_path):
+    """
+    Reads requests from stdin until EOF or a quit command.
+    :param script_path: Path to the bot's .py file.
+    """
+    # Keep a private handle on the real stdout for the protocol and point fd 1 at
+    # stderr, so a bot writing straight to the file descriptor cannot corrupt it.
+    protocol_out = os.fdopen(os.dup(sys.stdout.fileno()), "w")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    # Match `python bot.py`, where the bot's own directory is first on sys.path
+    sys.path[0] = os.path.dirname(os.path.abspath(script_path))
+
+    module = None
+    if "delta" in bot_capabilities(script_path):
+        module = load_module(script_path)
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError:
+            response = {"ok": False, "output": "", "error": "malformed request"}
+        else:
+            if request.get("cmd") == "quit":
+                break
+            response = handle_request(script_path, request, module)
+        protocol_out.write(json.dumps(response) + "\n")
+        protocol_out.flush()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("usage: python bot_shim.py <bot_script>", file=sys.stderr)
+        sys.exit(2)
+    serve(sys.argv[1])
@@ -0,0 +1,102 @@
+# bot_stats.py
+"""
+Bot call latency stored on matches and per bot over time.
+
+A match keeps its games' latency summaries and both bots' merged histograms
+(see latency.py) in Match.latency. Every timed game of a match or tournament is
+also merged into its bots' histograms for the day in the `bot_latency_daily`
+table, which GET /bots/{id}/stats reads. Games served from the match result
+cache were not played and are not timed.
+"""
+import json
+from datetime import datetime
+from latency import BotLatency
+from models import Bot, BotLatencyDaily
+
+
+def match_latency(results):
+    """
+    Builds the Match.latency value of a two-bot match.
+    :param results: The match's list of tournament.GameResult.
+    :return: JSON text with each game's summaries and each bot's merged histograms, or None if
+             no game was timed.
+    """
+    totals = [BotLatency(), BotLatency()]
+    games = []
+    for result in results:
+        if result.latency is None:
+            continue
+        for total, latency in zip(totals, result.latency):
+            total.merge(latency)
+        games.append({"game": result.game + 1, "bot1": result.latency[0].summary(),
+                      "bot2": result.latency[1].summary()})
+    if not games:
+        return None
+    return json.dumps({"bot1": totals[0].to_dict(), "bot2": totals[1].to_dict(), "games": games})
+
+
+def match_view(data):
+    """
+    Renders a stored Match.latency value for the API.
+    :return: A dictionary with each bot's summaries over the match and per game, or None.
+    """
+    if not data:
+        return None
+    data = json.loads(data)
+    return {
+        "bot1": BotLatency.from_dict(data["bot1"]).summary(),
+        "bot2": BotLatency.from_dict(data["bot2"]).summary(),
+        "games": data["games"]
+    }
+
+
+def record_latency(db, bots, results, now=None):
+    """
+    Merges every timed game into its bots' histograms for the day. The caller commits.
+    :param bots: The Bot rows that played, keyed by engine player name.
+    :param results: An iterable of tournament.GameResult.
+    """
+    per_bot = {}
+    games = {}
+    for result in results:
+        if result.latency is None:
+            continue
+        for name, latency in zip((result.player1, result.player2), result.latency):
+            per_bot.setdefault(name, BotLatency()).merge(latency)
+        for name in {result.player1, result.player2}:
+            games[name] = games.get(name, 0) + 1
+    if not per_bot:
+        return
+
+    # The bot rows are the lock that keeps workers from overwriting each other's day rows
+    ids = [bots[name].id for name in per_bot]
+    db.query(Bot).filter(Bot.id.in_(ids)).with_for_update().all()
+
+    day = (now or datetime.utcnow()).date()
+    for name, latency in per_bot.items():
+        row = db.query(BotLatencyDaily).filter(
+            BotLatencyDaily.bot_id == bots[name].id,
+            BotLatencyDaily.day == day
+        ).first()
+        if row is None:
+            row = BotLatencyDaily(bot_id=bots[name].id, day=day, games=0)
+            db.add(row)
+        merged = BotLatency.from_dict(json.loads(row.histograms) if row.histograms else None).merge(latency)
+        row.histograms = json.dumps(merged.to_dict())
+        row.games = (row.games or 0) + games[name]
+        db.flush()
+
+
+def daily_view(rows):
+    """
+    Renders a bot's `bot_latency_daily` rows for the API.
+    :param rows: BotLatencyDaily rows, oldest first.
+    :return: A dictionary with the summaries of every day and of all the days together.
+    """
+    total = BotLatency()
+    days = []
+    for row in rows:
+        latency = BotLatency.from_dict(json.loads(row.histograms) if row.histograms else None)
+        total.merge(latency)
+        days.append(dict(day=row.day.isoformat(), games=row.games, **latency.summary()))
+    return {"games": sum(row.games or 0 for row in rows), **total.summary(), "days": days}
@@ -0,0 +1,259 @@
+"""
+Seeded single- and double-elimination bracket tournaments.
+
+Bots are seeded in the order given (seed 1 first) and placed so the top seeds
+meet as late as possible; when the field is not a power of two the top seeds
+get byes. Every bracket match is a series of num_games games. The bot with more
+wins advances and a tied series goes to the better seed.
+
+In double elimination a bot is out after losing two series: losers of the
+winners bracket drop into the losers bracket, and the grand final is replayed
+once if the losers-bracket champion wins it.
+
+Matches are scheduled as soon as both of their players are known, not round by
+round, so a fast series sends its winner on while the rest of its round is still
+playing. A bracket plays N - 1 series (single) or at most 2N - 1 (double).
+"""
+import math
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from collections import defaultdict
+from bot_runner import enter_bot_process
+from events import NULL_SINK
+from tournament import TOURNAMENT_WORKERS, play_pairing
+
+# Where a bye sits in a bracket slot
+BYE = None
+
+
+class BracketMatch:
+    """
+    One series in a bracket. winner_to and loser_to are (match, slot) pairs, or None when the
+    winner takes the bracket or the loser is eliminated.
+    """
+
+    def __init__(self, index, stage):
+        self.index = index
+        self.stage = stage
+        self.slots = [BYE, BYE]
+        self.filled = 0
+        self.winner_to = None
+        self.loser_to = None
+        self.reset_on_upset = False
+
+
+def seed_order(size):
+    """
+    :return: Seeds 1..size in bracket position order, e.g. [1, 8, 4, 5, 2, 7, 3, 6] for 8,
+             so seeds 1 and 2 can only meet in the final.
+    """
+    order = [1]
+    while len(order) < size:
+        order = [seed for top in order for seed in (top, 2 * len(order) + 1 - top)]
+    return order
+
+
+class Bracket:
+    """
+    The state of a bracket: which matches are waiting on which results, and who is out.
+    """
+
+    def __init__(self, bot_files, double_elimination=False):
+        if len(bot_files) < 2:
+            raise ValueError("A bracket needs at least two bots")
+        self.bot_files = list(bot_files)
+        self.seeds = {bot: index for index, bot in enumerate(self.bot_files)}
+        self.matches = []
+        self.wins = defaultdict(int)
+        self.eliminated = {}
+        self.champion = None
+
+        size = 1 << math.ceil(math.log2(len(self.bot_files)))
+        entrants = [self.bot_files[seed - 1] if seed <= len(self.bot_files) else BYE for seed in seed_order(size)]
+        winners = self._single_elimination(size)
+        if double_elimination:
+            self._losers_bracket(winners)
+        self.first_round = winners[0]
+        self.entrants = entrants
+
+    def _new_match(self, stage):
+        match = BracketMatch(len(self.matches), stage)
+        self.matches.append(match)
+        return match
+
+    def _single_elimination(self, size):
+        """
+        :return: The winners bracket as a list of rounds, each a list of matches.
+        """
+        rounds = [[self._new_match(1) for _ in range(size // 2)]]
+        while len(rounds[-1]) > 1:
+            previous = rounds[-1]
+            current = [self._new_match(len(rounds) + 1) for _ in range(len(previous) // 2)]
+            for index, match in enumerate(previous):
+                match.winner_to = (current[index // 2], index % 2)
+            rounds.append(current)
+        return rounds
+
+    def _losers_bracket(self, winners):
+        """
+        Adds the losers bracket and the grand final behind a winners bracket.
+        """
+        stage = 0
+        grand_final = None
+        if len(winners) == 1:
+            grand_final = self._new_match(1)
+            winners[0][0].loser_to = (grand_final, 1)
+        else:
+            stage += 1
+            first = winners[0]
+            alive = [self._new_match(stage) for _ in range(len(first) // 2)]
+            for index, match in enumerate(first):
+                match.loser_to = (alive[index // 2], index % 2)
+            for number, wb_round in enumerate(winners[1:], 1):
+                # Losers dropping down meet survivors of the losers bracket; reversing every
+                # other round keeps them away from bots they just played
+                drops = wb_round[::-1] if number % 2 else wb_round
+                stage += 1
+                dropped = [self._new_match(stage) for _ in drops]
+                for index, (survivor, drop) in enumerate(zip(alive, drops)):
+                    survivor.winner_to = (dropped[index], 0)
+                    drop.loser_to = (dropped[index], 1)
+                alive = dropped
+                if len(alive) > 1:
+                    stage += 1
+                    merged = [self._new_match(stage) for _ in range(len(alive) // 2)]
+                    for index, match in enumerate(alive):
+                        match.winner_to = (merged[index // 2], index % 2)
+                    alive = merged
+            grand_final = self._new_match(stage + 1)
+            alive[0].winner_to = (grand_final, 1)
+        winners[-1][0].winner_to = (grand_final, 0)
+        grand_final.reset_on_upset = True
+
+    def start(self):
+        """
+        Places the seeded bots in the first round.
+        :return: The matches that are ready to be played.
+        """
+        ready = []
+        for index, bot in enumerate(self.entrants):
+            ready.extend(self._place(self.first_round[index // 2], index % 2, bot))
+        return ready
+
+    def _place(self, match, slot, bot):
+        match.slots[slot] = bot
+        match.filled += 1
+        if match.filled < 2:
+            return []
+        bot1, bot2 = match.slots
+        if bot1 is BYE or bot2 is BYE:
+            # Nothing to play; the bot (if any) walks through
+            return self._advance(match, bot2 if bot1 is BYE else bot1, BYE)
+        return [match]
+
+    def report(self, match, results):
+        """
+        Records a played series.
+        :param results: The GameResult tuples of the series.
+        :return: The matches that became ready to be played.
+        """
+        bot1, bot2 = match.slots
+        series = defaultdict(int)
+        for result in results:
+            if result.winner is not None:
+                series[result.winner] += 1
+        wins1, wins2 = series[bot1[:-3]], series[bot2[:-3]]
+        self.wins[bot1] += wins1
+        self.wins[bot2] += wins2
+        if wins1 > wins2 or (wins1 == wins2 and self.seeds[bot1] < self.seeds[bot2]):
+            return self._advance(match, bot1, bot2)
+        return self._advance(match, bot2, bot1)
+
+    def _advance(self, match, winner, loser):
+        if match.reset_on_upset and loser is not BYE and winner == match.slots[1]:
+            # The winners-bracket champion has now lost once too; play the final again
+            reset = self._new_match(match.stage)
+            self._place(reset, 0, match.slots[0])
+            return self._place(reset, 1, match.slots[1])
+
+        ready = []
+        if match.winner_to:
+            ready.extend(self._place(*match.winner_to, winner))
+        else:
+            self.champion = winner
+        if match.loser_to:
+            ready.extend(self._place(*match.loser_to, loser))
+        elif loser is not BYE:
+            self.eliminated[loser] = match.stage
+        return ready
+
+    def rankings(self):
+        """
+        Orders bots by how far they got, then by game wins, then by seed.
+        :return: A list of (rank, bot name, wins) tuples, like tournament.rank_results.
+        """
+        stages = dict(self.eliminated)
+        if self.champion is not None:
+            stages[self.champion] = math.inf
+        ranked = sorted(self.bot_files, key=lambda bot: (-stages.get(bot, 0), -self.wins[bot], self.seeds[bot]))
+        return [(index + 1, bot[:-3], self.wins[bot]) for index, bot in enumerate(ranked)]
+
+
+def play_bracket(bot_files, num_games, double_elimination=False, events=None, workers=None, trusted=(), seed=None):
+    """
+    Plays an elimination bracket. Every series whose players are known runs at once, on up to
+    `workers` processes.
+    :param bot_files: Bot file names inside the uploads directory, in seeding order.
+    :param num_games: Number of games per series.
+    :param double_elimination: Eliminate bots after two lost series instead of one.
+    :param events: Optional EventSink for game events. With several workers, each series'
+                   events are emitted when it finishes.
+    :param workers: Number of worker processes; see tournament.play_round_robin.
+    :param trusted: Bot file names allowed to run in-process; see tournament.play_round_robin.
+    :param seed: Seed the game seeds are derived from, with each series' bracket match index as
+                 its pairing; see tournament.play_round_robin.
+    :return: A tuple (results, rankings): every GameResult in bracket order, and a list of
+             (rank, bot name, wins) tuples.
+    """
+    workers = workers or TOURNAMENT_WORKERS
+    trusted = frozenset(trusted)
+    games = tuple(range(num_games))
+    bracket = Bracket(bot_files, double_elimination)
+    ready = bracket.start()
+    results = []
+
+    if workers <= 1:
+        while ready:
+            match = ready.pop(0)
+            series = play_pairing(match.index, *match.slots, games, events=events, trusted=trusted, seed=seed)[0]
+            results.extend(series)
+            ready.extend(bracket.report(match, series))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=enter_bot_process) as pool:
+            running = {}
+            while ready or running:
+                for match in ready:
+                    future = pool.submit(play_pairing, match.index, *match.slots, games,
+                                         events=None if events is not None else NULL_SINK, trusted=trusted,
+                                         seed=seed)
+                    running[future] = match
+                ready = []
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    match = running.pop(future)
+                    series, series_events = future.result()
+                    results.extend(series)
+                    if events is not None:
+                        for event in series_events:
+                            events.emit(**event)
+                    ready.extend(bracket.report(match, series))
+
+    results.sort(key=lambda r: (r.pairing, r.game))
+    return results, bracket.rankings()
+
+
+def run_bracket(bot_files, num_games, double_elimination=False, events=None, workers=None, trusted=(), seed=None):
+    """
+    Plays an elimination bracket and ranks the bots by how far they got. See play_bracket for the parameters.
+    :return: A list of (rank, bot name, wins) tuples.
+    """
+    return play_bracket(bot_files, num_games, double_elimination, events, workers, trusted, seed)[1]
@@ -0,0 +1,217 @@
+"""
+Bitboard core used by the game engine.
+
+Every board is 100 cells, indexed row-major from A1 (0) to J10 (99), and each
+set of cells is stored as a single Python integer with one bit per cell.  A
+precomputed cell -> ship table means a shot never has to search the fleet, and
+a ship is sunk exactly when its mask is fully contained in the hit mask.
+
+A finished game is kept as a GameRecord: its seed, both fleets and every shot.
+replay() rebuilds every board state from a record with the engine alone, no bot
+involved.
+"""
+from collections import namedtuple
+
+ROWS = "ABCDEFGHIJ"
+SIZE = 10
+CELLS = SIZE * SIZE
+ROW_INDEX = {row: i for i, row in enumerate(ROWS)}
+
+# One precomputed single-bit mask per cell, so hot paths never shift
+BITS = tuple(1 << cell for cell in range(CELLS))
+
+# Grids sent to bots are ten rows of ten characters joined by newlines, so cell
+# (r, c) lives at byte r * 11 + c of the serialized view
+VIEW_OFFSET = tuple((cell // SIZE) * (SIZE + 1) + cell % SIZE for cell in range(CELLS))
+EMPTY_VIEW = b"\n".join([b"~" * SIZE] * SIZE)
+EMPTY_CELLS = bytes(CELLS)
+
+MISS = 0
+HIT = 1
+SUNK = 2
+
+# Bump whenever a change to the rules or the engine can change how a game plays out;
+# memoized match results from other versions are then ignored (see match_cache.py)
+RULES_VERSION = 1
+
+# Everything needed to rebuild a game. fleets holds, per player, the cell indices of each
+# ship in fleet order; shots holds the cells fired at, alternating from player 0; winner is
+# the index of the winning player.
+GameRecord = namedtuple("GameRecord", ["seed", "players", "fleets", "shots", "winner", "reason"])
+
+
+def cell_index(row, col):
+    """
+    :param row: Row letter, 'A' to 'J'.
+    :param col: 1-based column number.
+    :return: The cell index 0..99.
+    """
+    return ROW_INDEX[row] * SIZE + col - 1
+
+
+def cell_name(cell):
+    """
+    :param cell: A cell index 0..99.
+    :return: The coordinate string, e.g. 'A1' or 'J10'.
+    """
+    return ROWS[cell // SIZE] + str(cell % SIZE + 1)
+
+
+class Board:
+    """
+    One player's side of a game: their fleet and the shots they have fired.
+
+    fleet      - bitboard of cells occupied by this player's ships
+    hits       - bitboard of this player's ship cells the opponent has hit
+    shots      - bitboard of cells this player has fired at
+    shot_hits  - the subset of `shots` that hit an enemy ship
+
+    ship_view and attack_view hold the grids exactly as bots receive them and are
+    patched in place as ships are placed and shots land, so building a bot's
+    input never re-serializes the board.
+    """
+    __slots__ = ("ship_names", "ship_symbols", "ship_masks", "cell_ship",
+                 "fleet", "hits", "shots", "shot_hits", "remaining",
+                 "ship_view", "attack_view")
+
+    def __init__(self, ship_names, ship_symbols):
+        self.ship_names = tuple(ship_names)
+        self.ship_symbols = tuple(ship_symbols)
+        self.ship_masks = [0] * len(self.ship_names)
+        # cell -> ship index + 1, 0 meaning open water
+        self.cell_ship = bytearray(CELLS)
+        self.fleet = 0
+        self.hits = 0
+        self.shots = 0
+        self.shot_hits = 0
+        self.remaining = len(self.ship_names)
+        self.ship_view = bytearray(EMPTY_VIEW)
+        self.attack_view = bytearray(EMPTY_VIEW)
+
+    @classmethod
+    def from_fleet(cls, ships):
+        """
+        :param ships: A fleet definition like Player.ships.
+        :return: An empty Board for that fleet.
+        """
+        return cls(ships.keys(), (ship["symbol"] for ship in ships.values()))
+
+    def clear(self):
+        """
+        Empties the board in place so it can be reused for the next game.
+        """
+        for i in range(len(self.ship_masks)):
+            self.ship_masks[i] = 0
+        self.cell_ship[:] = EMPTY_CELLS
+        self.fleet = 0
+        self.hits = 0
+        self.shots = 0
+        self.shot_hits = 0
+        self.remaining = len(self.ship_names)
+        self.ship_view[:] = EMPTY_VIEW
+        self.attack_view[:] = EMPTY_VIEW
+
+    def place(self, ship, cells):
+        """
+        Places a ship on the board. The caller is responsible for validating the placement.
+        :param ship: Index of the ship in ship_names.
+        :param cells: The cell indices the ship occupies.
+        """
+        mask = 0
+        symbol = ord(self.ship_symbols[ship])
+        for cell in cells:
+            mask |= BITS[cell]
+            self.cell_ship[cell] = ship + 1
+            self.ship_view[VIEW_OFFSET[cell]] = symbol
+        self.ship_masks[ship] = mask
+        self.fleet |= mask
+
+    def is_occupied(self, cell):
+        return self.fleet & BITS[cell] != 0
+
+    def has_fired_at(self, cell):
+        return self.shots & BITS[cell] != 0
+
+    def receive(self, cell):
+        """
+        Resolves an incoming shot against this board's fleet.
+        :param cell: The cell index being fired at.
+        :return: A tuple (result, ship) where result is MISS, HIT or SUNK and ship is
+                 the index of the ship that was hit, or -1 on a miss.
+        """
+        ship = self.cell_ship[cell] - 1
+        if ship < 0:
+            return MISS, -1
+        self.hits |= BITS[cell]
+        self.ship_view[VIEW_OFFSET[cell]] = 88  # 'X'
+        mask = self.ship_masks[ship]
+        if self.hits & mask == mask:
+            self.remaining -= 1
+            return SUNK, ship
+        return HIT, ship
+
+    def record_shot(self, cell, hit):
+        """
+        Marks a shot this player fired on their attack view.
+        :param cell: The cell index fired at.
+        :param hit: True if the shot hit a ship.
+        """
+        self.shots |= BITS[cell]
+        if hit:
+            self.shot_hits |= BITS[cell]
+            self.attack_view[VIEW_OFFSET[cell]] = 72  # 'H'
+        else:
+            self.attack_view[VIEW_OFFSET[cell]] = 77  # 'M'
+
+    def ship_cell(self, cell):
+        """
+        :return: What the ship grid shows at `cell`: None, a ship symbol, or 'X' once hit.
+        """
+        ship = self.cell_ship[cell]
+        if not ship:
+            return None
+        if self.hits & BITS[cell]:
+            return 'X'
+        return self.ship_symbols[ship - 1]
+
+    def attack_cell(self, cell):
+        """
+        :return: What the attack grid shows at `cell`: None, 'H' or 'M'.
+        """
+        bit = BITS[cell]
+        if not self.shots & bit:
+            return None
+        return 'H' if self.shot_hits & bit else 'M'
+
+    def ship_string(self):
+        """
+        :return: The ship grid as ten newline separated rows of '~', ship symbols and 'X'.
+        """
+        return self.ship_view.decode("ascii")
+
+    def attack_string(self):
+        """
+        :return: The attack grid as ten newline separated rows of '~', 'H' and 'M'.
+        """
+        return self.attack_view.decode("ascii")
+
+
+def replay(record, ship_names, ship_symbols):
+    """
+    Replays a recorded game shot by shot.
+    :param record: A GameRecord.
+    :param ship_names: The fleet's ship names, in the order the record lists ships.
+    :param ship_symbols: The matching ship symbols.
+    :return: A generator of (shooter, cell, result, ship, boards) tuples, one per shot, where
+             result and ship are as returned by Board.receive and boards is the pair of Boards
+             after the shot. The boards are updated in place; copy what you need to keep.
+    """
+    boards = (Board(ship_names, ship_symbols), Board(ship_names, ship_symbols))
+    for board, fleet in zip(boards, record.fleets):
+        for ship, cells in enumerate(fleet):
+            board.place(ship, cells)
+    for turn, cell in enumerate(record.shots):
+        shooter = turn % 2
+        result, ship = boards[1 - shooter].receive(cell)
+        boards[shooter].record_shot(cell, result != MISS)
+        yield shooter, cell, result, ship, boards
@@ -0,0 +1,91 @@
+"""
+Structured events emitted by the game engine.
+
+The engine reports what happens through a sink instead of printing:
+
+    game_started  player1, player2, seed
+    move          player, move, result            (result is "hit", "miss" or "sunk")
+    hit           player, opponent, move
+    sunk          player, opponent, move, ship
+    game_over     winner, loser, reason, moves    (moves maps player name -> list of moves)
+    error         player, message                 (bad placement, malformed move, ...)
+
+The default NullSink discards everything, so a headless tournament writes
+nothing to the console. TextSink, JsonSink and MemorySink are opt-in.
+"""
+import json
+import sys
+
+
+class EventSink:
+    """
+    Base class for event sinks. Subclasses override emit().
+    """
+    def emit(self, event, **data):
+        pass
+
+
+class NullSink(EventSink):
+    """
+    Discards every event.
+    """
+    pass
+
+
+NULL_SINK = NullSink()
+
+
+class TextSink(EventSink):
+    """
+    Writes human-readable lines, similar to the engine's old console output.
+    """
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def _write(self, line):
+        print(line, file=self.stream or sys.stdout)
+
+    def emit(self, event, **data):
+        if event == "game_started":
+            self._write(f"{data['player1']} vs {data['player2']}")
+        elif event == "move":
+            if data["result"] == "miss":
+                self._write(f"{data['player']} missed at {data['move']}.")
+            elif data["result"] == "hit":
+                self._write(f"{data['player']} hit a ship at {data['move']}!")
+        elif event == "sunk":
+            self._write(f"{data['player']} sunk {data['opponent']}'s {data['ship']}!")
+        elif event == "game_over":
+            self._write(f"{data['winner']} wins ({data['reason']}).")
+        elif event == "error":
+            self._write(f"Error: {data['message']}")
+
+
+class JsonSink(EventSink):
+    """
+    Writes one JSON object per event, one per line.
+    """
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def emit(self, event, **data):
+        stream = self.stream or sys.stdout
+        stream.write(json.dumps({"event": event, **data}) + "\n")
+
+
+class MemorySink(EventSink):
+    """
+    Keeps every event in a list, mostly for inspecting games after the fact.
+    """
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event, **data):
+        self.events.append({"event": event, **data})
+
+    def of_type(self, event):
+        """
+        :param event: The event name to filter on.
+        :return: All recorded events with that name.
+        """
+        return [e for e in self.events if e["event"] == event]
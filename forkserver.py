@@ -0,0 +1,150 @@
+"""
+Fork server that runs argv-style bots without paying interpreter startup per call.
+
+The engine starts `python forkserver.py <socket_path>` once. The server imports
+the standard library modules bots commonly use (plus FORKSERVER_PRELOAD) and
+then waits on a Unix socket. For every bot invocation the engine connects and
+sends one JSON line:
+
+    {"script": "uploads/bot.py", "args": ["initialize"], "seed": 1234}
+
+The server forks. The child writes its pid as the first line of the
+connection, points its stdout at the connection and runs the script as
+__main__ with the same sys.argv `python <script> <args>` would have had, so
+everything the bot prints reaches the engine exactly as with a subprocess.
+The connection closes when the child exits. The engine uses the pid to kill
+the child's process group if it runs out of time. With a "seed" the child is
+seeded with bot_loader.seed_bot() instead of fresh random state.
+
+The server exits when its stdin is closed, i.e. when the engine goes away.
+"""
+import json
+import os
+import select
+import signal
+import socket
+import sys
+import traceback
+from bot_loader import run_path, seed_bot
+from bot_runner import limit_resources
+
+# Imported once in the server so forked bots find them already loaded
+PRELOAD = [
+    "argparse", "ast", "collections", "copy", "dataclasses", "functools", "heapq", "itertools",
+    "json", "math", "random", "re", "statistics", "string", "time", "typing",
+]
+PRELOAD += [name for name in os.getenv("FORKSERVER_PRELOAD", "numpy").split(",") if name]
+
+
+def preload():
+    for name in PRELOAD:
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+    # numpy's first seed() call is slow; pay it here instead of in every child
+    reseed()
+
+
+def reseed():
+    """
+    Gives the child fresh random state; otherwise every forked bot would replay the
+    server's random sequence.
+    """
+    if "random" in sys.modules:
+        sys.modules["random"].seed()
+    if "numpy" in sys.modules:
+        # An explicit 32-bit seed; seed() with no argument spends milliseconds gathering entropy
+        sys.modules["numpy"].random.seed(int.from_bytes(os.urandom(4), "little"))
+
+
+def run_child(conn, request):
+    """
+    Runs one bot invocation in the forked child and exits with its status.
+    """
+    status = 0
+    try:
+        # The bot's stderr, and any traceback below, is discarded like subprocess mode's DEVNULL
+        null = os.open(os.devnull, os.O_RDWR)
+        os.dup2(null, 2)
+        os.setsid()
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        limit_resources()
+        if request.get("seed") is not None:
+            seed_bot(request["seed"])
+        else:
+            reseed()
+        conn.sendall(f"{os.getpid()}\n".encode())
+
+        sys.stdout.flush()
+        os.dup2(conn.fileno(), 1)
+        conn.close()
+        os.dup2(null, 0)
+        os.close(null)
+        sys.stdin = open(0, "r", closefd=False)
+
+        script = request["script"]
+        sys.argv = [script] + list(request.get("args", []))
+        sys.path[0] = os.path.dirname(os.path.abspath(script))
+        try:
+            run_path(script, run_name="__main__")
+        except SystemExit as e:
+            if e.code is None:
+                status = 0
+            elif isinstance(e.code, int):
+                status = e.code
+            else:
+                print(e.code, file=sys.stderr)
+                status = 1
+    except BaseException:
+        traceback.print_exc()
+        status = 1
+    finally:
+        try:
+            sys.stdout.flush()
+        except Exception:
+            pass
+        os._exit(status)
+
+
+def serve(socket_path):
+    """
+    Accepts invocations on `socket_path` until stdin is closed.
+    """
+    preload()
+    # Let the kernel reap finished children
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(64)
+    sys.stdout.write("ready\n")
+    sys.stdout.flush()
+
+    while True:
+        ready, _, _ = select.select([listener, sys.stdin], [], [])
+        if sys.stdin in ready and not os.read(sys.stdin.fileno(), 4096):
+            break
+        if listener not in ready:
+            continue
+        conn, _ = listener.accept()
+        try:
+            with conn.makefile("rb") as reader:
+                request = json.loads(reader.readline())
+        except ValueError:
+            conn.close()
+            continue
+        if os.fork() == 0:
+            listener.close()
+            run_child(conn, request)
+        conn.close()
+
+    listener.close()
+    os.unlink(socket_path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("usage: python forkserver.py <socket_path>", file=sys.stderr)
+        sys.exit(2)
+    serve(sys.argv[1])
@@ -0,0 +1,206 @@
+# gamelog.py
+"""
+Compact binary game log stored in Match.game_logs and Tournament.game_logs.
+
+A log is a plain concatenation of game entries, so it can be written and read
+one game at a time. Each entry is
+
+    header   12 bytes: b"BG", format version, reason code, game number (uint16),
+             seed (uint32), winner (0 or 1), unused byte, all little-endian
+    fleets   for each player: ship count, then per ship its length and cell indices
+    shots    shot count (uint16), then one byte per shot: the cell index (0-99)
+             with bit 7 set when the shot hit
+
+Shots alternate between the players, starting with the first, exactly like
+engine.GameRecord. Whether a hit sank a ship is not stored; the reader works it
+out from the fleets. A 190-shot game takes about 250 bytes; its per-move JSON view,
+rendered by json_view() only when the API asks for it, is about 10 KB.
+"""
+import io
+import json
+import struct
+from engine import BITS, MISS, HIT, SUNK, GameRecord, cell_name
+
+MAGIC = b"BG"
+VERSION = 1
+HEADER = struct.Struct("<2sBBHIBx")
+SHOT_COUNT = struct.Struct("<H")
+HIT_FLAG = 0x80
+
+# Reason codes; anything else is stored as "unknown"
+REASONS = ("fleet_sunk", "invalid_move", "timeout", "output_limit")
+UNKNOWN_REASON = 255
+
+RESULT_NAMES = {MISS: "miss", HIT: "hit", SUNK: "sunk"}
+
+
+class GameLogError(ValueError):
+    """
+    Raised when a game log is truncated or not in this format.
+    """
+    pass
+
+
+def shot_results(record):
+    """
+    Works out what every shot of a record did, from the fleets alone.
+    :return: A list of (result, ship) tuples like engine.Board.receive returns.
+    """
+    cell_ship = [{}, {}]
+    masks = [[], []]
+    for player, fleet in enumerate(record.fleets):
+        for ship, cells in enumerate(fleet):
+            mask = 0
+            for cell in cells:
+                cell_ship[player][cell] = ship
+                mask |= BITS[cell]
+            masks[player].append(mask)
+    hits = [0, 0]
+    results = []
+    for turn, cell in enumerate(record.shots):
+        target = 1 - turn % 2
+        ship = cell_ship[target].get(cell, -1)
+        if ship < 0:
+            results.append((MISS, -1))
+            continue
+        hits[target] |= BITS[cell]
+        mask = masks[target][ship]
+        results.append((SUNK if hits[target] & mask == mask else HIT, ship))
+    return results
+
+
+class GameLogWriter:
+    """
+    Appends game entries to a binary stream.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, game, record):
+        """
+        :param game: The game's number within its match.
+        :param record: The game's engine.GameRecord.
+        """
+        reason = REASONS.index(record.reason) if record.reason in REASONS else UNKNOWN_REASON
+        data = bytearray(HEADER.pack(MAGIC, VERSION, reason, game, record.seed, record.winner))
+        for fleet in record.fleets:
+            data.append(len(fleet))
+            for cells in fleet:
+                data.append(len(cells))
+                data += bytes(cells)
+        data += SHOT_COUNT.pack(len(record.shots))
+        data += bytes(cell | HIT_FLAG if result != MISS else cell
+                      for cell, (result, _) in zip(record.shots, shot_results(record)))
+        self.stream.write(data)
+
+
+def _read(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise GameLogError("truncated game log")
+    return data
+
+
+def read_games(stream, players=("player1", "player2")):
+    """
+    Reads game entries from a binary stream one at a time.
+    :param players: The players' names, stored in the returned records.
+    :return: A generator of (game, engine.GameRecord) tuples.
+    :raises GameLogError: If the stream is not a game log.
+    """
+    while True:
+        header = stream.read(HEADER.size)
+        if not header:
+            return
+        if len(header) != HEADER.size:
+            raise GameLogError("truncated game log")
+        magic, version, reason, game, seed, winner = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise GameLogError("not a game log")
+        fleets = []
+        for _ in range(2):
+            fleet = []
+            for _ in range(_read(stream, 1)[0]):
+                fleet.append(tuple(_read(stream, _read(stream, 1)[0])))
+            fleets.append(tuple(fleet))
+        count, = SHOT_COUNT.unpack(_read(stream, SHOT_COUNT.size))
+        shots = tuple(shot & ~HIT_FLAG for shot in _read(stream, count))
+        yield game, GameRecord(seed, tuple(players), tuple(fleets), shots, winner,
+                               REASONS[reason] if reason < len(REASONS) else "unknown")
+
+
+def encode(games):
+    """
+    :param games: An iterable of (game, engine.GameRecord) tuples.
+    :return: The binary log.
+    """
+    stream = io.BytesIO()
+    writer = GameLogWriter(stream)
+    for game, record in games:
+        writer.write(game, record)
+    return stream.getvalue()
+
+
+def decode(data, players=("player1", "player2")):
+    """
+    :return: A list of (game, engine.GameRecord) tuples read from a binary log.
+    """
+    return list(read_games(io.BytesIO(data), players))
+
+
+def game_view(game, record, ship_names=None):
+    """
+    Renders one game as JSON-serializable data.
+    :param ship_names: Names to show for sunk ships, in fleet order; indices are shown if None.
+    :return: A dictionary with the seed, fleets, every shot and its result, and the outcome.
+    """
+    shots = []
+    for turn, (cell, (result, ship)) in enumerate(zip(record.shots, shot_results(record))):
+        shot = {"player": record.players[turn % 2], "move": cell_name(cell), "result": RESULT_NAMES[result]}
+        if result == SUNK:
+            shot["ship"] = ship_names[ship] if ship_names else ship
+        shots.append(shot)
+    return {
+        "game": game + 1,
+        "seed": record.seed,
+        "fleets": [
+            {"player": player, "ships": [[cell_name(cell) for cell in cells] for cells in fleet]}
+            for player, fleet in zip(record.players, record.fleets)
+        ],
+        "shots": shots,
+        "winner": record.players[record.winner],
+        "reason": record.reason
+    }
+
+
+def json_view(data, players=("player1", "player2"), ship_names=None):
+    """
+    Renders a stored game log for the API. Logs written before the binary format are JSON text
+    and are returned parsed.
+    :param data: The Match.game_logs value.
+    :return: A list of game dictionaries, see game_view.
+    """
+    if isinstance(data, str):
+        return json.loads(data)
+    if not data.startswith(MAGIC):
+        return json.loads(bytes(data).decode("utf-8"))
+    return [game_view(game, record, ship_names) for game, record in read_games(io.BytesIO(data), players)]
+
+
+def tournament_view(data, index, names=None, ship_names=None):
+    """
+    Renders a tournament's game log for the API.
+    :param data: The Tournament.game_logs value.
+    :param index: The Tournament.game_index value: JSON [pairing, game, player1, player2] per logged game.
+    :param names: Optional mapping from the engine's player names to the names to show.
+    :return: A list of game dictionaries, see game_view, each with its series' "pairing" index.
+    """
+    names = names or {}
+    games = []
+    for (game, record), (pairing, _, player1, player2) in zip(read_games(io.BytesIO(data)), json.loads(index)):
+        players = (names.get(player1, player1), names.get(player2, player2))
+        view = game_view(game, record._replace(players=players), ship_names)
+        view["pairing"] = pairing
+        games.append(view)
+    return games
@@ -0,0 +1,186 @@
+# job_queue.py
+"""
+Durable job queue kept in the `jobs` table.
+
+Every match or tournament the API accepts becomes a queued Job row. Any number
+of worker processes, on any number of hosts, can share one database: a worker
+claims a job by taking a lease on it, renews the lease with heartbeats while it
+plays, and marks it completed or failed. A job whose lease runs out (its worker
+crashed or lost the database) is claimable again, so nothing stays "running"
+forever.
+
+On PostgreSQL the claim uses `SELECT ... FOR UPDATE SKIP LOCKED`, so concurrent
+workers never wait on each other's rows. Other databases (SQLite for local runs)
+fall back to a conditional UPDATE that only succeeds for one claimer.
+
+A job can still be run twice: its worker may lose the lease while playing, or
+die between saving the results and releasing the job. Runners therefore save
+their results in the same transaction as complete(), which only succeeds while
+the worker holds the lease, and skip targets that are already completed.
+"""
+import os
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
+from models import Job
+
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+
+class LeaseLost(Exception):
+    """
+    Raised when a worker tries to complete a job it no longer holds.
+    """
+    pass
+
+
+def enqueue(db, kind, target_id):
+    """
+    Queues a job, or returns the unfinished one already queued for the same target.
+    :param kind: "match" or "tournament".
+    :param target_id: Id of the Match or Tournament to run.
+    :return: The Job row.
+    """
+    job = db.query(Job).filter(
+        Job.kind == kind,
+        Job.target_id == target_id,
+        Job.status.in_(["queued", "running"])
+    ).first()
+    if job:
+        return job
+    job = Job(
+        id=uuid.uuid4(),
+        kind=kind,
+        target_id=target_id,
+        status="queued",
+        attempts=0,
+        max_attempts=JOB_MAX_ATTEMPTS
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def claimable(now):
+    """
+    :return: The filter matching queued jobs and running jobs whose lease has expired.
+    """
+    return or_(
+        Job.status == "queued",
+        and_(Job.status == "running", Job.lease_expires_at < now)
+    )
+
+
+def claim(db, worker_id, job_id=None, lease_seconds=None):
+    """
+    Atomically takes a lease on the oldest claimable job.
+    :param worker_id: Name of the claiming worker, stored on the job.
+    :param job_id: Only try to claim this job.
+    :param lease_seconds: Length of the lease (default JOB_LEASE_SECONDS).
+    :return: The claimed Job, or None if there was nothing to claim.
+    """
+    lease_seconds = lease_seconds or JOB_LEASE_SECONDS
+    now = datetime.utcnow()
+    query = db.query(Job).filter(claimable(now))
+    if job_id is not None:
+        query = query.filter(Job.id == job_id)
+    query = query.order_by(Job.created_at)
+
+    if db.bind.dialect.name == "postgresql":
+        job = query.with_for_update(skip_locked=True).first()
+        if job is None:
+            db.rollback()
+            return None
+        job.status = "running"
+        job.attempts = (job.attempts or 0) + 1
+        job.worker_id = worker_id
+        job.started_at = now
+        job.heartbeat_at = now
+        job.lease_expires_at = now + timedelta(seconds=lease_seconds)
+        db.commit()
+        return job
+
+    # No row locks: whoever's conditional update changes the row owns it
+    for candidate_id, attempts in query.with_entities(Job.id, Job.attempts).limit(10).all():
+        claimed = db.query(Job).filter(Job.id == candidate_id, claimable(now)).update({
+            "status": "running",
+            "attempts": (attempts or 0) + 1,
+            "worker_id": worker_id,
+            "started_at": now,
+            "heartbeat_at": now,
+            "lease_expires_at": now + timedelta(seconds=lease_seconds)
+        }, synchronize_session=False)
+        db.commit()
+        if claimed == 1:
+            return db.query(Job).filter(Job.id == candidate_id).first()
+    return None
+
+
+def heartbeat(db, job_id, worker_id, lease_seconds=None):
+    """
+    Extends the lease of a job this worker still holds.
+    :return: False if the lease was lost, e.g. it expired and another worker reclaimed the job.
+    """
+    lease_seconds = lease_seconds or JOB_LEASE_SECONDS
+    now = datetime.utcnow()
+    renewed = db.query(Job).filter(
+        Job.id == job_id,
+        Job.worker_id == worker_id,
+        Job.status == "running"
+    ).update({
+        "heartbeat_at": now,
+        "lease_expires_at": now + timedelta(seconds=lease_seconds)
+    }, synchronize_session=False)
+    db.commit()
+    return renewed == 1
+
+
+def complete(db, job_id, worker_id):
+    """
+    Marks a job this worker holds as completed, without committing, so the caller can
+    commit it in the same transaction as the job's results.
+    :raises LeaseLost: If the worker no longer holds the job; the caller must roll back.
+    """
+    completed = db.query(Job).filter(
+        Job.id == job_id,
+        Job.worker_id == worker_id,
+        Job.status == "running"
+    ).update({
+        "status": "completed",
+        "completed_at": datetime.utcnow(),
+        "lease_expires_at": None
+    }, synchronize_session=False)
+    if completed != 1:
+        raise LeaseLost(f"Worker {worker_id} no longer holds job {job_id}")
+
+
+def finish(db, job_id, worker_id, error=None):
+    """
+    Releases a job this worker holds. A failed job goes back on the queue until it
+    has used up its attempts.
+    :param error: The failure message, or None if the job succeeded.
+    :return: The job's new status, or None if the worker no longer held it.
+    """
+    job = db.query(Job).filter(
+        Job.id == job_id,
+        Job.worker_id == worker_id,
+        Job.status == "running"
+    ).first()
+    if not job:
+        db.rollback()
+        return None
+    if error is None:
+        job.status = "completed"
+        job.completed_at = datetime.utcnow()
+    else:
+        job.last_error = error
+        if job.attempts >= job.max_attempts:
+            job.status = "failed"
+            job.completed_at = datetime.utcnow()
+        else:
+            job.status = "queued"
+    job.lease_expires_at = None
+    db.commit()
+    return job.status
@@ -0,0 +1,367 @@
+# jobs.py
+"""
+Execution of queued matches and tournaments.
+
+The API records a Match or Tournament as "pending" and queues a Job for it
+(see job_queue.py). Whoever claims the job, a `python -m worker` process or the
+API's own embedded worker, runs one of the functions below with its own
+database session: they move the record to "running", play the games and store
+the results as "completed". A job that fails is retried until it runs out of
+attempts, after which the record is marked "failed". Clients poll the existing
+GET endpoints.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import traceback
+import uuid
+from datetime import datetime
+from sqlalchemy.orm import joinedload
+from database import SessionLocal
+from models import Match, Tournament, TournamentEntry, TournamentResult
+from tournament import play_pairing, play_round_robin, rank_results
+from player import new_seed, uploads_dir
+import gamelog
+import match_cache
+from placement import file_digest
+from sqlalchemy.exc import IntegrityError
+from swiss import play_swiss
+from bracket import play_bracket
+from ratings import record_results
+from bot_stats import match_latency, record_latency
+from sprt import SequentialTest
+from live import HubSink, hub
+import job_queue
+from job_queue import LeaseLost
+
+logger = logging.getLogger(__name__)
+
+# Let the API process claim the jobs it queues; turn off when dedicated workers run
+EMBEDDED_WORKER = os.getenv("EMBEDDED_WORKER", "true").lower() in ("1", "true", "yes")
+# Seconds between the embedded worker's polls for retried jobs and expired leases
+EMBEDDED_WORKER_POLL_SECONDS = float(os.getenv("EMBEDDED_WORKER_POLL_SECONDS", "5"))
+
+# Values accepted for Tournament.format
+TOURNAMENT_FORMATS = ("round_robin", "swiss", "single_elimination", "double_elimination")
+
+
+def bot_name(bot):
+    """
+    :return: The player name the engine uses for a Bot row (its stored filename without .py).
+    """
+    return bot.filename[:-3]
+
+
+def trusted_files(bots):
+    """
+    :return: The filenames of the bots an admin flagged as trusted to run in-process.
+    """
+    return [bot.filename for bot in bots if bot.is_trusted]
+
+
+def default_worker_id():
+    """
+    :return: A worker name unique across hosts and processes.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def commit_results(db, job_id, worker_id):
+    """
+    Commits a job's results together with the job's completion, so results are saved at most
+    once even if the job ran twice.
+    :param job_id: The job being run, or None when the runner was called without one.
+    :raises LeaseLost: If the worker lost the job meanwhile; nothing is saved.
+    """
+    if job_id is not None:
+        try:
+            job_queue.complete(db, job_id, worker_id)
+        except LeaseLost:
+            db.rollback()
+            raise
+    db.commit()
+
+
+def run_match_job(db, match_id, job_id=None, worker_id=None):
+    """
+    Plays a match and stores the outcome on its Match row.
+    :param match_id: Id of the Match to run.
+    :param job_id: The job running it; the results are only saved while its worker holds it.
+    :param worker_id: The worker running the job.
+    """
+    status = db.query(Match.status).filter(Match.id == match_id).scalar()
+    if status == "completed":
+        # An earlier run saved the results but its worker died before releasing the job
+        commit_results(db, job_id, worker_id)
+        return
+    db.query(Match).filter(Match.id == match_id).update(
+        {"status": "running", "started_at": datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    match = db.query(Match).options(
+        joinedload(Match.bot1),
+        joinedload(Match.bot2)
+    ).filter(Match.id == match_id).first()
+    if match.seed is None:
+        # Keep the seed across retries so a retried match plays the same games
+        match.seed = new_seed()
+        db.commit()
+    logger.info(f"Match {match_id} started between {match.bot1.filename} and {match.bot2.filename}")
+
+    # Viewers of /matches/{id}/ws and /matches/{id}/events follow along through the hub
+    topic = str(match_id)
+    try:
+        name1, name2 = bot_name(match.bot1), bot_name(match.bot2)
+        trusted = trusted_files([match.bot1, match.bot2])
+        test = None
+        if match.series == "sprt":
+            test = SequentialTest(name1, name2, match.sprt_alpha, match.sprt_beta)
+
+        # Identical bots replaying the same seed play the same games; reuse a memoized result
+        key = match_cache.cache_key(file_digest(os.path.join(uploads_dir, match.bot1.filename)),
+                                    file_digest(os.path.join(uploads_dir, match.bot2.filename)),
+                                    match.seed, match.rounds_to_play, match.series, match.sprt_alpha, match.sprt_beta)
+        results = match_cache.lookup(db, key, name1, name2)
+        cached = results is not None
+        if cached:
+            logger.info(f"Match {match_id} replayed from the result cache")
+            if test is not None:
+                for result in results:
+                    test.record(result)
+        elif test is not None:
+            # Play one game at a time until the test names a winner or rounds_to_play runs out
+            results = play_pairing(0, match.bot1.filename, match.bot2.filename, range(match.rounds_to_play),
+                                   events=HubSink(topic), trusted=trusted, until=test.record, seed=match.seed)[0]
+        else:
+            results = play_round_robin([match.bot1.filename, match.bot2.filename], match.rounds_to_play,
+                                       events=HubSink(topic), trusted=trusted, seed=match.seed)
+
+        match.games_played = len(results)
+        match.game_logs = gamelog.encode((r.game, r.record) for r in results if r.record is not None)
+        match.bot1_wins = sum(1 for r in results if r.winner == name1)
+        match.bot2_wins = sum(1 for r in results if r.winner == name2)
+        match.latency = match_latency(results)
+        if not cached:
+            # Replayed games are not new evidence about the bots
+            record_results(db, {name1: match.bot1, name2: match.bot2}, results)
+            record_latency(db, {name1: match.bot1, name2: match.bot2}, results)
+        if test is not None and test.winner is not None:
+            match.winner_id = match.bot1_id if test.winner == name1 else match.bot2_id
+        elif match.bot1_wins > match.bot2_wins:
+            match.winner_id = match.bot1_id
+        elif match.bot2_wins > match.bot1_wins:
+            match.winner_id = match.bot2_id
+        match.status = "completed"
+        match.completed_at = datetime.utcnow()
+        commit_results(db, job_id, worker_id)
+        if not cached:
+            try:
+                match_cache.store(db, key, results, name1)
+                db.commit()
+            except IntegrityError:
+                # Another worker memoized the same match first
+                db.rollback()
+        hub.publish(topic, {"event": "match_over", "status": match.status,
+                            "bot1_wins": match.bot1_wins, "bot2_wins": match.bot2_wins,
+                            "games_played": match.games_played})
+        logger.info(f"Match {match_id} completed: {match.bot1_wins}-{match.bot2_wins}")
+    finally:
+        hub.close(topic)
+
+
+def run_tournament_job(db, tournament_id, job_id=None, worker_id=None):
+    """
+    Plays a tournament and stores a TournamentResult for every entry.
+    :param tournament_id: Id of the Tournament to run.
+    :param job_id: The job running it; the results are only saved while its worker holds it.
+    :param worker_id: The worker running the job.
+    """
+    status = db.query(Tournament.status).filter(Tournament.id == tournament_id).scalar()
+    if status == "completed":
+        # An earlier run saved the results but its worker died before releasing the job
+        commit_results(db, job_id, worker_id)
+        return
+    db.query(Tournament).filter(Tournament.id == tournament_id).update(
+        {"status": "running", "started_at": datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    tournament = db.query(Tournament).filter(Tournament.id == tournament_id).first()
+    if tournament.seed is None:
+        # Keep the seed across retries so a retried tournament plays the same games
+        tournament.seed = new_seed()
+        db.commit()
+    entries = db.query(TournamentEntry).options(
+        joinedload(TournamentEntry.bot)
+    ).filter(TournamentEntry.tournament_id == tournament_id).order_by(TournamentEntry.registered_at).all()
+
+    bot_files = [entry.bot.filename for entry in entries]
+    trusted = trusted_files(entry.bot for entry in entries)
+    if tournament.format == "swiss":
+        # Each Swiss pairing plays a series of `rounds` games; bots are scored by series points
+        results, rankings, scores = play_swiss(bot_files, tournament.rounds, trusted=trusted, seed=tournament.seed)
+    elif tournament.format in ("single_elimination", "double_elimination"):
+        # Bots are seeded in registration order
+        results, rankings = play_bracket(bot_files, tournament.rounds, tournament.format == "double_elimination",
+                                         trusted=trusted, seed=tournament.seed)
+        scores = {name: wins for _, name, wins in rankings}
+    else:
+        results = play_round_robin(bot_files, tournament.rounds, trusted=trusted, seed=tournament.seed)
+        rankings = rank_results(bot_files, results)
+        scores = {name: wins for _, name, wins in rankings}
+
+    # Save results, replacing any a crashed attempt left behind
+    db.query(TournamentResult).filter(TournamentResult.tournament_id == tournament_id).delete(synchronize_session=False)
+    entries_by_name = {bot_name(entry.bot): entry for entry in entries}
+    for rank, name, wins in rankings:
+        entry = entries_by_name.get(name)
+        if not entry:
+            continue
+        losses = sum(1 for r in results if r.loser == name)
+        db.add(TournamentResult(
+            id=uuid.uuid4(),
+            tournament_id=tournament_id,
+            entry_id=entry.id,
+            rank=rank,
+            wins=wins,
+            losses=losses,
+            score=scores[name]
+        ))
+
+    # The log does not hold player names, so the index says which series and bots each game belongs to
+    recorded = [r for r in results if r.record is not None]
+    tournament.game_logs = gamelog.encode((r.game, r.record) for r in recorded)
+    tournament.game_index = json.dumps([[r.pairing, r.game, r.player1, r.player2] for r in recorded])
+
+    bots = {bot_name(entry.bot): entry.bot for entry in entries}
+    record_results(db, bots, results)
+    record_latency(db, bots, results)
+    tournament.status = "completed"
+    tournament.completed_at = datetime.utcnow()
+    commit_results(db, job_id, worker_id)
+    logger.info(f"Tournament {tournament_id} completed")
+
+
+# Job kind -> (record model, function that plays it)
+JOB_KINDS = {
+    "match": (Match, run_match_job),
+    "tournament": (Tournament, run_tournament_job),
+}
+
+
+class Heartbeat(threading.Thread):
+    """
+    Renews a job's lease in the background while the games are played.
+    """
+
+    def __init__(self, job_id, worker_id, interval=None):
+        super().__init__(daemon=True)
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.interval = interval or max(1, job_queue.JOB_LEASE_SECONDS // 3)
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            db = SessionLocal()
+            try:
+                if not job_queue.heartbeat(db, self.job_id, self.worker_id):
+                    logger.warning(f"Worker {self.worker_id} lost the lease on job {self.job_id}")
+                    return
+            except Exception as e:
+                logger.warning(f"Heartbeat for job {self.job_id} failed: {e}")
+            finally:
+                db.close()
+
+    def stop(self):
+        self.stopped.set()
+
+
+def run_job(job_id=None, worker_id=None):
+    """
+    Claims one job and runs it to completion.
+    :param job_id: Only run this job; by default the oldest claimable job is taken.
+    :param worker_id: Name recorded on the job (default host:pid).
+    :return: True if a job was claimed.
+    """
+    worker_id = worker_id or default_worker_id()
+    db = SessionLocal()
+    try:
+        job = job_queue.claim(db, worker_id, job_id=job_id)
+        if job is None:
+            return False
+        job_id, kind, target_id = job.id, job.kind, job.target_id
+        model, runner = JOB_KINDS[kind]
+
+        error = None
+        if job.attempts > job.max_attempts:
+            # Workers kept dying on this job, so its lease expired one time too many
+            error = job.last_error or "lease expired"
+        else:
+            heartbeat = Heartbeat(job_id, worker_id)
+            heartbeat.start()
+            try:
+                # On success the runner marks the job completed when it saves the results
+                runner(db, target_id, job_id, worker_id)
+                return True
+            except LeaseLost:
+                # Another worker took the job over and saves the results instead
+                logger.warning(f"Job {job_id} ({kind} {target_id}) was taken over; its results were discarded")
+                return True
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                logger.error(f"Job {job_id} ({kind} {target_id}) failed: {error}")
+                logger.error(traceback.format_exc())
+                db.rollback()
+            finally:
+                heartbeat.stop()
+
+        status = job_queue.finish(db, job_id, worker_id, error)
+        if error is not None and status is not None:
+            # Retried jobs go back to pending until the last attempt fails
+            db.query(model).filter(model.id == target_id).update(
+                {"status": "failed" if status == "failed" else "pending"}, synchronize_session=False)
+            db.commit()
+        return True
+    finally:
+        db.close()
+
+
+class EmbeddedWorker(threading.Thread):
+    """
+    Polls the queue from the API process while EMBEDDED_WORKER is on. submit_job starts new
+    jobs right away; this picks up everything else: failed attempts put back on the queue,
+    and jobs whose lease expired because the process playing them died.
+    """
+
+    def __init__(self, worker_id=None, interval=None):
+        super().__init__(daemon=True)
+        self.worker_id = worker_id or default_worker_id()
+        self.interval = interval or EMBEDDED_WORKER_POLL_SECONDS
+        self.stopped = threading.Event()
+
+    def run(self):
+        while True:
+            try:
+                while not self.stopped.is_set() and run_job(worker_id=self.worker_id):
+                    pass
+            except Exception as e:
+                # Database unavailable or similar; try again on the next poll
+                logger.error(f"Embedded worker {self.worker_id} error: {e}")
+            if self.stopped.wait(self.interval):
+                return
+
+    def stop(self):
+        self.stopped.set()
+
+
+def submit_job(db, background_tasks, kind, target_id):
+    """
+    Queues a job for a match or tournament and, with EMBEDDED_WORKER on, lets this
+    process run it once the response has been sent.
+    :param background_tasks: The request's FastAPI BackgroundTasks.
+    :return: The Job row.
+    """
+    job = job_queue.enqueue(db, kind, target_id)
+    if EMBEDDED_WORKER:
+        background_tasks.add_task(run_job, job.id)
+    return job
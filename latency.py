@@ -0,0 +1,125 @@
+# latency.py
+"""
+Per-bot call latency, recorded on every game.
+
+The engine times each bot call (see player.start_game) and adds it to a
+streaming histogram per player and game, one for `initialize` and one for
+moves. The histogram has fixed log-spaced buckets, each about 9% wider than the
+one before, so it takes constant memory, merges by adding counts, and reports
+percentiles within about 9% of the exact value; the maximum is kept exactly.
+
+bot_stats.py stores the histograms on matches and per bot and day.
+"""
+import math
+
+# Buckets per doubling; bucket i holds latencies up to 2 ** (i / BUCKETS_PER_DOUBLING) microseconds
+BUCKETS_PER_DOUBLING = 8
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyHistogram:
+    """
+    Streaming latency histogram with fixed log-spaced buckets.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        """
+        :param seconds: One call's latency.
+        """
+        micros = max(seconds * 1e6, 1.0)
+        bucket = math.ceil(math.log2(micros) * BUCKETS_PER_DOUBLING)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        """
+        Adds another histogram's calls to this one.
+        :return: This histogram.
+        """
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        return self
+
+    def percentile(self, percent):
+        """
+        :param percent: A percentile between 0 and 100.
+        :return: The latency in seconds at or below which `percent`% of the calls fell, or None if empty.
+        """
+        if not self.count:
+            return None
+        rank = max(math.ceil(self.count * percent / 100), 1)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(2 ** (bucket / BUCKETS_PER_DOUBLING) / 1e6, self.max)
+        return self.max
+
+    def summary(self):
+        """
+        :return: The call count and the mean, p50, p95, p99 and max latency in milliseconds.
+        """
+        if not self.count:
+            return {"count": 0}
+        summary = {"count": self.count, "mean_ms": round(self.total / self.count * 1e3, 3)}
+        for percent in PERCENTILES:
+            summary[f"p{percent}_ms"] = round(self.percentile(percent) * 1e3, 3)
+        summary["max_ms"] = round(self.max * 1e3, 3)
+        return summary
+
+    def to_dict(self):
+        return {"buckets": {str(bucket): count for bucket, count in self.buckets.items()},
+                "count": self.count, "total": self.total, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        if data:
+            histogram.buckets = {int(bucket): count for bucket, count in data["buckets"].items()}
+            histogram.count = data["count"]
+            histogram.total = data["total"]
+            histogram.max = data["max"]
+        return histogram
+
+
+class BotLatency:
+    """
+    One bot's `initialize` and move latency histograms.
+    """
+
+    def __init__(self, initialize=None, move=None):
+        self.initialize = initialize or LatencyHistogram()
+        self.move = move or LatencyHistogram()
+
+    def add(self, turn, seconds):
+        """
+        :param turn: 0 for initialize, then the bot's move number, as in player.call_seed.
+        """
+        (self.initialize if turn == 0 else self.move).add(seconds)
+
+    def merge(self, other):
+        self.initialize.merge(other.initialize)
+        self.move.merge(other.move)
+        return self
+
+    def summary(self):
+        return {"initialize": self.initialize.summary(), "move": self.move.summary()}
+
+    def to_dict(self):
+        return {"initialize": self.initialize.to_dict(), "move": self.move.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        data = data or {}
+        return cls(LatencyHistogram.from_dict(data.get("initialize")), LatencyHistogram.from_dict(data.get("move")))
@@ -0,0 +1,134 @@
+# live.py
+"""
+In-process pub/sub hub for watching matches live.
+
+A running match publishes its engine events once, under the match id, and the
+hub fans them out to every viewer subscribed to that match:
+
+    engine thread --HubSink--> hub.publish(topic) --> one bounded asyncio.Queue per viewer
+
+Publishing never blocks the engine. Each subscriber's queue holds at most
+LIVE_BUFFER_SIZE events; when a slow viewer falls behind, its oldest events are
+dropped (and counted) instead of the engine waiting on it.
+
+The hub lives in one process, so only jobs run by the API's embedded worker can
+be watched; games played by a separate `python -m worker` are not visible here.
+"""
+import asyncio
+import os
+import threading
+from events import EventSink
+
+LIVE_BUFFER_SIZE = int(os.getenv("LIVE_BUFFER_SIZE", "256"))
+
+# Put on a subscriber's queue once the topic is closed
+END_OF_STREAM = None
+
+
+class Subscription:
+    """
+    One viewer's bounded queue of events. Only read it from the event loop it was created on.
+    """
+
+    def __init__(self, topic, loop, maxsize):
+        self.topic = topic
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def _put(self, item):
+        # Runs on self.loop, so checking and then putting cannot race a reader
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(item)
+
+    async def get(self, timeout=None):
+        """
+        :param timeout: Seconds to wait, or None to wait until an event arrives.
+        :return: The next event, or END_OF_STREAM once the topic is closed.
+        :raises asyncio.TimeoutError: If no event arrived in time.
+        """
+        if timeout is None:
+            return await self.queue.get()
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class EventHub:
+    """
+    Fans out published events to every subscriber of a topic.
+    """
+
+    def __init__(self, buffer_size=None):
+        self.buffer_size = buffer_size or LIVE_BUFFER_SIZE
+        self.subscribers = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, topic, maxsize=None):
+        """
+        Starts following a topic. Must be called from a running event loop.
+        :return: A Subscription; pass it to unsubscribe() when done.
+        """
+        subscription = Subscription(topic, asyncio.get_running_loop(), maxsize or self.buffer_size)
+        with self.lock:
+            self.subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.subscribers.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscribers[subscription.topic]
+
+    def has_subscribers(self, topic):
+        with self.lock:
+            return topic in self.subscribers
+
+    def publish(self, topic, event):
+        """
+        Delivers an event to every current subscriber of a topic. Safe to call from any thread.
+        :param event: A JSON-serializable dictionary.
+        """
+        with self.lock:
+            subscribers = list(self.subscribers.get(topic, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, event)
+            except RuntimeError:
+                # The viewer's event loop has shut down
+                self.unsubscribe(subscription)
+
+    def close(self, topic):
+        """
+        Ends a topic: every subscriber receives END_OF_STREAM and is removed.
+        """
+        with self.lock:
+            subscribers = self.subscribers.pop(topic, set())
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, END_OF_STREAM)
+            except RuntimeError:
+                pass
+
+
+hub = EventHub()
+
+
+class HubSink(EventSink):
+    """
+    Publishes engine events to the hub under one topic, e.g. a match id.
+    """
+
+    def __init__(self, topic, event_hub=None):
+        self.topic = topic
+        self.hub = event_hub or hub
+        self.game = 0
+
+    def emit(self, event, **data):
+        if event == "game_started":
+            self.game += 1
+        # Skip building the event when nobody is watching
+        if self.hub.has_subscribers(self.topic):
+            self.hub.publish(self.topic, {"event": event, "game": self.game, **data})
@@ -3,6 +3,7 @@ from typing import List, Optional, Callable
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.responses import RedirectResponse
+from starlette.concurrency import run_in_threadpool
 from tournament import run_tournament
 import os
 import subprocess
@@ -27,6 +28,8 @@ from fastapi import Request, Depends
 from fastapi import FastAPI, APIRouter
 from database import engine, Base, get_db
 import models
+import jobs
+from schema import upgrade_schema
 from routes import tournaments, users, bots, matches
 import traceback
 
@@ -41,7 +44,8 @@ load_dotenv()  # Load environment variables from .env file
 oauth = init_oauth()
 
 def create_tables():
-    Base.metadata.create_all(bind=engine)
+    # Also adds the columns and indexes older databases lack, see schema.py
+    upgrade_schema(engine)
 
 # Create FastAPI app with explicit root_path to handle URL normalization
 app = FastAPI(root_path="")
@@ -63,6 +67,19 @@ async def global_exception_handler(request: Request, exc: Exception):
 # Call this function when starting the app
 create_tables()
 
+# With EMBEDDED_WORKER on, this process also retries failed jobs and takes over expired leases
+embedded_worker = jobs.EmbeddedWorker() if jobs.EMBEDDED_WORKER else None
+
+@app.on_event("startup")
+def start_embedded_worker():
+    if embedded_worker is not None:
+        embedded_worker.start()
+
+@app.on_event("shutdown")
+def stop_embedded_worker():
+    if embedded_worker is not None:
+        embedded_worker.stop()
+
 # Define BYPASS_AUTH global variable
 BYPASS_AUTH = os.getenv('BYPASS_AUTH', 'false').lower() == 'true'
 
@@ -628,7 +645,8 @@ async def upload_tournament_files(request: Request, user=Depends(auth_required))
             bot_files.append(file.filename)
 
 
-    rankings = run_tournament(bot_files,3)
+    # Run the games in a worker thread so other requests are not blocked meanwhile
+    rankings = await run_in_threadpool(run_tournament, bot_files, 3)
     return {"rankings": rankings}
 
 @app.post("/upload/")
@@ -663,8 +681,8 @@ async def play_two_bots(file1: UploadFile, file2: UploadFile, user=Depends(auth_
 
     #print(bot_files)
 
-    # Run the tournament with the uploaded files
-    rankings = run_tournament(bot_files,3)
+    # Run the tournament with the uploaded files in a worker thread so other requests are not blocked meanwhile
+    rankings = await run_in_threadpool(run_tournament, bot_files, 3)
     print(rankings)
     return {"rankings": rankings}
 
@@ -0,0 +1,140 @@
+# match_cache.py
+"""
+Memoized match results.
+
+Games are reproducible: a bot's calls are seeded from the game's seed (see
+player.call_seed), so two byte-for-byte identical bots replaying a match with
+the same seed play the same games. A finished match is therefore stored under
+
+    sha256(bot1 digest, bot2 digest, seed, engine.RULES_VERSION, bot time and output
+           limits, rounds, series settings)
+
+and a later match with the same key, typically a rematch, takes its per-game
+outcomes and game logs from the `match_result_cache` table instead of starting
+the bots.
+
+That only holds for bots whose play depends on nothing but the seed; a bot that
+reads the clock or asks a network service does not replay its games. Like
+placement.PlacementCache, a result is therefore only served once the match was
+played MATCH_CACHE_PROBE_RUNS times in a row with byte-for-byte identical game
+logs. Until then every match with the key is played and counts as one more
+probe, and a key whose plays ever differed is never served. Changing either bot changes its digest. Bumping engine.RULES_VERSION
+makes every older entry unreachable, and those entries are pruned on the next
+store.
+
+Matches with a game forfeited for running out of time or printing too much are
+not stored: whether a bot hits a limit depends on how busy the machine was, not
+on the seed. The table keeps the MATCH_CACHE_SIZE most recently used entries; 0
+turns the cache off.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+from bot_runner import BOT_GAME_TIMEOUT, BOT_MOVE_TIMEOUT, BOT_OUTPUT_LIMIT
+from engine import RULES_VERSION
+from sprt import SPRT_MARGIN
+from models import MatchResultCache
+from tournament import GameResult
+import gamelog
+
+MATCH_CACHE_SIZE = int(os.getenv("MATCH_CACHE_SIZE", "10000"))
+# Number of identical plays of a match in a row before its result is served from the cache
+MATCH_CACHE_PROBE_RUNS = int(os.getenv("MATCH_CACHE_PROBE_RUNS", "2"))
+
+# Forfeit reasons that depend on machine load rather than on the seed
+LOAD_DEPENDENT_REASONS = ("timeout", "output_limit")
+
+
+def cache_key(bot1_digest, bot2_digest, seed, rounds, series="fixed", alpha=None, beta=None):
+    """
+    :param bot1_digest: SHA-256 of the first bot's file.
+    :param bot2_digest: SHA-256 of the second bot's file.
+    :param series: The match's series mode; adaptive series also key on their error rates and SPRT_MARGIN.
+    :return: The cache key for a match.
+    """
+    parts = [bot1_digest, bot2_digest, seed, RULES_VERSION, BOT_MOVE_TIMEOUT, BOT_GAME_TIMEOUT, BOT_OUTPUT_LIMIT,
+             rounds, series or "fixed"]
+    if series == "sprt":
+        parts += [alpha, beta, SPRT_MARGIN]
+    return hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def lookup(db, key, name1, name2):
+    """
+    Fetches a memoized match whose bots proved deterministic and marks it as recently used.
+    The caller commits.
+    :param name1: Engine name of the first bot in the new match.
+    :param name2: Engine name of the second bot in the new match.
+    :return: The match's list of GameResult, or None on a miss.
+    """
+    if MATCH_CACHE_SIZE <= 0:
+        return None
+    entry = db.query(MatchResultCache).filter(
+        MatchResultCache.key == key,
+        MatchResultCache.rules_version == RULES_VERSION,
+        MatchResultCache.plays >= MATCH_CACHE_PROBE_RUNS
+    ).first()
+    if entry is None:
+        return None
+    entry.hits = (entry.hits or 0) + 1
+    entry.last_used_at = datetime.utcnow()
+
+    players = (name1, name2)
+    records = dict(gamelog.decode(entry.game_logs, players)) if entry.game_logs else {}
+    results = []
+    for game, winner in enumerate(json.loads(entry.outcomes)):
+        if winner is None:
+            results.append(GameResult(0, game, name1, name2, None, None, records.get(game)))
+        else:
+            results.append(GameResult(0, game, name1, name2, players[winner], players[1 - winner], records.get(game)))
+    return results
+
+
+def cacheable(results):
+    """
+    :return: False if a game of the match was forfeited for a load-dependent reason.
+    """
+    return not any(r.record is not None and r.record.reason in LOAD_DEPENDENT_REASONS for r in results)
+
+
+def store(db, key, results, name1):
+    """
+    Records one play of a match and trims the table to MATCH_CACHE_SIZE entries: a play identical
+    to the stored one counts as one more probe, a different one marks the key as never to be
+    served. Matches that are not cacheable are skipped. The caller commits.
+    :param results: The match's list of GameResult.
+    :param name1: Engine name of the first bot.
+    """
+    if MATCH_CACHE_SIZE <= 0 or not cacheable(results):
+        return
+    outcomes = json.dumps([None if r.winner is None else (0 if r.winner == name1 else 1) for r in results])
+    game_logs = gamelog.encode((r.game, r.record) for r in results if r.record is not None)
+    now = datetime.utcnow()
+    entry = db.query(MatchResultCache).filter(
+        MatchResultCache.key == key,
+        MatchResultCache.rules_version == RULES_VERSION
+    ).first()
+    if entry is None:
+        db.add(MatchResultCache(
+            key=key,
+            rules_version=RULES_VERSION,
+            outcomes=outcomes,
+            game_logs=game_logs,
+            hits=0,
+            plays=1,
+            created_at=now,
+            last_used_at=now
+        ))
+    else:
+        if entry.plays is not None and entry.plays >= 0:
+            # The seed alone decides a deterministic pair's games, so any difference rules the pair out
+            same = entry.outcomes == outcomes and bytes(entry.game_logs or b"") == game_logs
+            entry.plays = entry.plays + 1 if same else -1
+        entry.last_used_at = now
+    db.flush()
+    db.query(MatchResultCache).filter(MatchResultCache.rules_version != RULES_VERSION).delete(
+        synchronize_session=False)
+    stale = db.query(MatchResultCache.key).order_by(MatchResultCache.last_used_at.desc()).offset(MATCH_CACHE_SIZE)
+    db.query(MatchResultCache).filter(MatchResultCache.key.in_(stale.scalar_subquery())).delete(
+        synchronize_session=False)
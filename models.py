@@ -1,5 +1,5 @@
 # models.py
-from sqlalchemy import UUID, Column, Integer, String, DateTime, ForeignKey, Boolean, Text
+from sqlalchemy import UUID, Column, Integer, Float, String, Date, DateTime, ForeignKey, Boolean, Text, LargeBinary
 from sqlalchemy.orm import relationship
 import datetime
 
@@ -33,8 +33,13 @@ class Bot(Base):
     file_path = Column(String)
     upload_date = Column(DateTime, default=datetime.datetime.utcnow)
     is_active = Column(Boolean, default=True)
+    is_trusted = Column(Boolean, default=False)  # Set by admins; trusted bots run inside the engine process
     uploader_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
     description = Column(Text, nullable=True)
+    rating = Column(Float, default=1500, index=True)  # Glicko rating, see ratings.py
+    rating_deviation = Column(Float, default=350)
+    rated_games = Column(Integer, default=0)
+    rated_at = Column(DateTime, nullable=True)
     
     # Relationship with User
     owner = relationship("User", back_populates="bots")
@@ -55,11 +60,17 @@ class Match(Base):
     bot1_id = Column(UUID(as_uuid=True), ForeignKey("bots.id"))
     bot2_id = Column(UUID(as_uuid=True), ForeignKey("bots.id"))
     winner_id = Column(UUID(as_uuid=True), ForeignKey("bots.id"), nullable=True)
-    rounds_to_play = Column(Integer, default=3)
+    rounds_to_play = Column(Integer, default=3)  # Games to play; the most to play in an adaptive series
+    series = Column(String, default="fixed")  # fixed, sprt (see sprt.py)
+    sprt_alpha = Column(Float, nullable=True)
+    sprt_beta = Column(Float, nullable=True)
+    games_played = Column(Integer, default=0)
+    seed = Column(Integer, nullable=True)  # Game seeds are derived from it, see tournament.game_seed
     bot1_wins = Column(Integer, default=0)
     bot2_wins = Column(Integer, default=0)
     status = Column(String)  # pending, running, completed, failed
-    game_logs = Column(Text, nullable=True)
+    game_logs = Column(LargeBinary, nullable=True)  # Binary game log, see gamelog.py
+    latency = Column(Text, nullable=True)  # JSON bot call latency histograms, see bot_stats.py
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
@@ -77,6 +88,10 @@ class Tournament(Base):
     name = Column(String)
     description = Column(Text, nullable=True)
     rounds = Column(Integer, default=3)
+    format = Column(String, default="round_robin")  # round_robin, swiss, single_elimination, double_elimination
+    seed = Column(Integer, nullable=True)  # Game seeds are derived from it, see tournament.game_seed
+    game_logs = Column(LargeBinary, nullable=True)  # Binary game log, see gamelog.py
+    game_index = Column(Text, nullable=True)  # JSON [pairing, game, player1, player2] of every logged game
     status = Column(String)  # pending, running, completed, failed
     creator_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
@@ -110,8 +125,45 @@ class TournamentResult(Base):
     rank = Column(Integer)
     wins = Column(Integer, default=0)
     losses = Column(Integer, default=0)
-    score = Column(Integer, default=0)
+    score = Column(Float, default=0)
     
     # Relationships
     tournament = relationship("Tournament", back_populates="results")
-    entry = relationship("TournamentEntry", back_populates="result")
\ No newline at end of file
+    entry = relationship("TournamentEntry", back_populates="result")
+
+class Job(Base):
+    __tablename__ = "jobs"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, index=True)
+    kind = Column(String)  # match, tournament
+    target_id = Column(UUID(as_uuid=True), index=True)  # Match.id or Tournament.id
+    status = Column(String, index=True)  # queued, running, completed, failed
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    worker_id = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+
+class MatchResultCache(Base):
+    __tablename__ = "match_result_cache"
+    
+    key = Column(String, primary_key=True)  # See match_cache.cache_key
+    rules_version = Column(Integer, index=True)
+    outcomes = Column(Text)  # JSON list with the winning player (0, 1 or null) of every game
+    game_logs = Column(LargeBinary, nullable=True)  # Binary game log, see gamelog.py
+    hits = Column(Integer, default=0)
+    plays = Column(Integer, default=1)  # Identical plays in a row, or -1 once two plays differed
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+
+class BotLatencyDaily(Base):
+    __tablename__ = "bot_latency_daily"
+    
+    bot_id = Column(UUID(as_uuid=True), ForeignKey("bots.id"), primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC
+    games = Column(Integer, default=0)
+    histograms = Column(Text)  # JSON initialize and move latency histograms, see latency.py
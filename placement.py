@@ -0,0 +1,172 @@
+"""
+Parsing and validation of a bot's ship placement.
+
+A placement is what a bot prints for `initialize`: one line per ship,
+
+    <ship_name>,<row1><col1>,<row2><col2>,...,<rowN><colN>
+
+e.g. `Carrier,A1,A2,A3,A4,A5`. parse_placement() works directly on that text,
+so nothing has to be written to disk between the bot and the engine, and
+PlacementCache lets deterministic bots skip `initialize` altogether.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from engine import ROW_INDEX, SIZE, cell_index
+
+
+class PlacementError(ValueError):
+    """
+    Raised when a ship placement is malformed or breaks the rules.
+    """
+    pass
+
+
+def parse_placement(text, ships):
+    """
+    Validates a ship placement against a fleet definition.
+    :param text: The placement text printed by the bot.
+    :param ships: The fleet definition, e.g. Player.ships.
+    :return: A dictionary mapping each ship name to the list of cell indices it occupies,
+             in the order the ships appeared in the text.
+    :raises PlacementError: If the placement is invalid.
+    """
+    placement = {}
+    occupied = set()
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        parts = line.split(',')
+        ship_name = parts[0].strip()
+        coordinates = [coord.strip() for coord in parts[1:]]
+
+        # Get the ship details from the fleet
+        ship = ships.get(ship_name)
+        if not ship:
+            raise PlacementError(f"Ship '{ship_name}' not found in the fleet.")
+        if ship_name in placement:
+            raise PlacementError(f"Ship '{ship_name}' is placed more than once.")
+
+        # Check if the number of coordinates matches the ship's length
+        if len(coordinates) != ship["length"]:
+            raise PlacementError(f"Ship '{ship_name}' requires {ship['length']} coordinates, but {len(coordinates)} were provided.")
+
+        # Extract rows and columns from coordinates
+        try:
+            rows = [coord[0].upper() for coord in coordinates]
+            cols = [int(coord[1:]) for coord in coordinates]
+        except (IndexError, ValueError):
+            raise PlacementError(f"Ship '{ship_name}' has a malformed coordinate.")
+
+        # Check that every coordinate is within the grid bounds
+        for coord, row, col in zip(coordinates, rows, cols):
+            if row not in ROW_INDEX or col < 1 or col > SIZE:
+                raise PlacementError(f"Coordinate '{coord}' for {ship_name} is out of bounds.")
+
+        # Check if the ship is placed horizontally or vertically
+        horizontal = all(row == rows[0] for row in rows) and cols == list(range(cols[0], cols[0] + len(cols)))
+        vertical = all(col == cols[0] for col in cols) and [ord(row) for row in rows] == list(range(ord(rows[0]), ord(rows[0]) + len(rows)))
+        if not (horizontal or vertical):
+            raise PlacementError(f"Ship '{ship_name}' is not placed horizontally or vertically.")
+
+        # Check that the ship does not overlap another one
+        cells = [cell_index(row, col) for row, col in zip(rows, cols)]
+        for coord, cell in zip(coordinates, cells):
+            if cell in occupied:
+                raise PlacementError(f"Coordinate '{coord}' for {ship_name} overlaps with another ship.")
+        occupied.update(cells)
+        placement[ship_name] = cells
+
+    missing = [name for name in ships if name not in placement]
+    if missing:
+        raise PlacementError(f"Missing ships: {', '.join(missing)}.")
+    return placement
+
+
+# Number of identical `initialize` outputs in a row before a bot is treated as deterministic
+PLACEMENT_PROBE_RUNS = int(os.getenv("PLACEMENT_PROBE_RUNS", "3"))
+# Maximum number of bots whose placement is remembered
+PLACEMENT_CACHE_SIZE = int(os.getenv("PLACEMENT_CACHE_SIZE", "256"))
+
+
+# path -> ((mtime, size), digest), so unchanged files are not re-hashed every game
+_digests = {}
+
+
+def file_digest(path):
+    """
+    :param path: Path to a bot file.
+    :return: The SHA-256 hex digest of the file's contents.
+    The digest is only recomputed when the file's size or modification time changes.
+    """
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _digests.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    _digests[path] = (key, digest)
+    return digest
+
+
+class PlacementCache:
+    """
+    Remembers the validated fleet of bots whose `initialize` output never changes.
+
+    Entries are keyed by the SHA-256 of the bot file, so editing or re-uploading a
+    bot invalidates its entry automatically. A bot is only cached after it printed
+    the same placement `probe_runs` times in a row; until then every game still
+    runs `initialize` and counts as one more probe. The least recently used
+    entries are evicted once `max_size` bots are tracked.
+    """
+    def __init__(self, probe_runs=PLACEMENT_PROBE_RUNS, max_size=PLACEMENT_CACHE_SIZE):
+        self.probe_runs = probe_runs
+        self.max_size = max_size
+        # digest -> [placement text, times seen in a row, validated placement or None]
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, digest):
+        """
+        :param digest: SHA-256 of the bot file.
+        :return: The cached placement if the bot is known to be deterministic, else None.
+        """
+        if self.probe_runs <= 0:
+            return None
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is None or entry[2] is None:
+                return None
+            self.entries.move_to_end(digest)
+            return entry[2]
+
+    def observe(self, digest, text, placement):
+        """
+        Records one validated `initialize` output from a bot.
+        :param digest: SHA-256 of the bot file.
+        :param text: The placement text the bot printed.
+        :param placement: The validated placement returned by parse_placement().
+        """
+        if self.probe_runs <= 0:
+            return
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is None or entry[0] != text:
+                entry = [text, 0, None]
+                self.entries[digest] = entry
+            entry[1] += 1
+            if entry[1] >= self.probe_runs:
+                entry[2] = placement
+            self.entries.move_to_end(digest)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+placement_cache = PlacementCache()
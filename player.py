@@ -1,28 +1,109 @@
-import subprocess
 import os
+import random
+import time
+from bot_runner import make_bot, BotLimitExceeded, BOT_GAME_TIMEOUT, BOT_MOVE_TIMEOUT
+from engine import Board, GameRecord, ROWS, ROW_INDEX, SIZE, MISS, SUNK, cell_index, replay
+from events import NULL_SINK
+from latency import BotLatency
+from placement import parse_placement, PlacementError, placement_cache, file_digest
 
 uploads_dir = "uploads"
 if not os.path.exists(uploads_dir):
     os.makedirs(uploads_dir)
 
+# The standard fleet every player places, in placement order
+FLEET = {
+    "Carrier": {"length": 5, "symbol": "C"},
+    "Battleship": {"length": 4, "symbol": "B"},
+    "Cruiser": {"length": 3, "symbol": "R"},
+    "Submarine": {"length": 3, "symbol": "S"},
+    "Destroyer": {"length": 2, "symbol": "D"},
+}
+
+# Game seeds are drawn from the OS, never from the `random` module bots may have seeded
+_seed_source = random.SystemRandom()
+
+
+def new_seed():
+    """
+    :return: A fresh game seed.
+    """
+    return _seed_source.randrange(2 ** 31)
+
+
+def call_seed(seed, turn, player_index):
+    """
+    Derives the seed a bot gets for one call from its game's seed, so every call of a
+    replayed game sees the same random numbers again.
+    :param turn: 0 for initialize, then the bot's move number.
+    :param player_index: 0 for the first player, 1 for the second.
+    :return: An integer below 2**32.
+    """
+    return (seed * 1000003 + turn * 2 + player_index) % 2 ** 32
+
+
+def replay_game(record):
+    """
+    Replays a recorded game with the standard fleet. No bot is started.
+    :param record: An engine.GameRecord.
+    :return: A generator of (shooter, cell, result, ship, boards) tuples; see engine.replay.
+    """
+    return replay(record, FLEET.keys(), [ship["symbol"] for ship in FLEET.values()])
+
+
 class Player:
-    def __init__(self, name):
+    def __init__(self, name, mode=None):
         self.name = name
-        self.ship_grid = {chr(65 + i): [None for _ in range(10)] for i in range(10)}  
-        self.attack_grid = {chr(65 + i): [None for _ in range(10)] for i in range(10)} 
         self.ships = {
-            "Carrier": {"length": 5, "health": 5, "positions": [], "symbol": "C"},
-            "Battleship": {"length": 4, "health": 4, "positions": [], "symbol": "B"},
-            "Cruiser": {"length": 3, "health": 3, "positions": [], "symbol": "R"},
-            "Submarine": {"length": 3, "health": 3, "positions": [], "symbol": "S"},
-            "Destroyer": {"length": 2, "health": 2, "positions": [], "symbol": "D"},
+            ship_name: {"length": ship["length"], "health": ship["length"], "positions": [], "symbol": ship["symbol"]}
+            for ship_name, ship in FLEET.items()
         }
+        self.board = Board.from_fleet(self.ships)
         self.wins = 0
         self.losses = 0
-        self.remaining_ships = 5
+        self.remaining_ships = len(self.ships)
         self.moves_list = []
+        self.last_result = None
+        self.last_sunk = None
+        self.time_used = 0.0  # seconds this game spent waiting on the bot
         self.script = f"{self.name}.py"
+        self.mode = mode
+        self.bot = None
 
+    def runner(self):
+        """
+        Returns the runner used to talk to this player's bot, starting it on first use.
+        The runner is kept across games so a session bot is only started once per series.
+        """
+        if self.bot is None:
+            self.bot = make_bot(self.script_path, self.mode)
+        return self.bot
+
+    @property
+    def script_path(self):
+        return os.path.join(uploads_dir, self.script)
+
+    def close(self):
+        """
+        Stops the player's bot process, if one is running.
+        """
+        if self.bot is not None:
+            self.bot.close()
+            self.bot = None
+
+    @property
+    def ship_grid(self):
+        """
+        Dictionary view of the ship grid keyed 'A'..'J', built on demand from the bitboards.
+        """
+        return {row: [self.board.ship_cell(r * SIZE + c) for c in range(SIZE)] for r, row in enumerate(ROWS)}
+
+    @property
+    def attack_grid(self):
+        """
+        Dictionary view of the attack grid keyed 'A'..'J', built on demand from the bitboards.
+        """
+        return {row: [self.board.attack_cell(r * SIZE + c) for c in range(SIZE)] for r, row in enumerate(ROWS)}
 
     def display_board(self, grid_type='ship'):
         grid = self.ship_grid if grid_type == 'ship' else self.attack_grid
@@ -52,160 +133,141 @@ class Player:
         Resets both the ship_grid and attack_grid to their original state (all cells set to None).
         Clears the positions of all ships and resets their health to the original values.
         """
-        # Reset ship_grid
-        for row in self.ship_grid:
-            self.ship_grid[row] = [None for _ in range(10)]
-
-        # Reset attack_grid
-        for row in self.attack_grid:
-            self.attack_grid[row] = [None for _ in range(10)]
+        # Clear the bitboards in place instead of reallocating the grids
+        self.board.clear()
 
         # Clear the positions and reset the health of all ships
         for ship in self.ships.values():
-            ship["positions"] = []
+            ship["positions"].clear()
             ship["health"] = ship["length"]  # Reset health to the ship's length 
 
-        self.remaining_ships = 5
+        self.remaining_ships = len(self.ships)
         self.moves_list = []
+        self.last_result = None
+        self.last_sunk = None
+        self.time_used = 0.0
 
 
-def start_game(player1, player2):
+def start_game(player1, player2, events=None, seed=None, records=None, latencies=None):
     """
-    Initializes the ship grids for both players based on their respective .txt files.
-    Each ship's placement is specified by all its coordinates in the file.
+    Initializes the ship grids for both players from their bots' `initialize` output and plays the game.
+    Each ship's placement is specified by all its coordinates, one ship per line.
     :param player1: First Player object.
     :param player2: Second Player object.
-    :return: 0 if both boards are initialized successfully, -1 otherwise.
+    :param events: EventSink that receives the game's events; nothing is reported by default.
+    :param seed: The game's seed; every bot call is seeded from it (see call_seed). A new
+                 seed is drawn if None.
+    :param records: Optional list; the finished game's engine.GameRecord is appended to it.
+    :param latencies: Optional list; a tuple of both players' latency.BotLatency is appended to it
+                      and filled in as the bots are called.
+    :return: The winner's name, or -1 if a board could not be initialized.
+             A bot that runs out of time or prints too much forfeits the game.
     """
+    events = events or NULL_SINK
+    if seed is None:
+        seed = new_seed()
+    fleets = {}
+    shots = []
+    latency = {player1: BotLatency(), player2: BotLatency()}
+    if latencies is not None:
+        latencies.append((latency[player1], latency[player2]))
+
+    def call_bot(player, turn, call, *args):
+        """
+        Calls the bot within the per-move timeout and what is left of its per-game budget.
+        :param turn: 0 for initialize, then the bot's move number; picks the call's seed.
+        :param call: A runner method such as initialize or next_move.
+        :raises BotLimitExceeded: If the bot used up its budget.
+        """
+        player.runner().seed = call_seed(seed, turn, 0 if player is player1 else 1)
+        timeout = BOT_MOVE_TIMEOUT if BOT_MOVE_TIMEOUT > 0 else None
+        if BOT_GAME_TIMEOUT > 0:
+            left = BOT_GAME_TIMEOUT - player.time_used
+            if left <= 0:
+                raise BotLimitExceeded("timeout", f"used up its {BOT_GAME_TIMEOUT:.0f}s game budget")
+            timeout = left if timeout is None else min(timeout, left)
+        started = time.monotonic()
+        try:
+            return call(*args, timeout=timeout)
+        finally:
+            elapsed = time.monotonic() - started
+            player.time_used += elapsed
+            latency[player].add(turn, elapsed)
+
     def make_board(player):
-        file_name = f"{player.name}.txt"
-        board_str = subprocess.run(['python', os.path.join(uploads_dir, player.script), 'initialize'], capture_output=True, text = True).stdout
-        board_str = board_str[:-1]    #this generates a new line
-        file_path = os.path.join(uploads_dir, file_name)
-        with open(file_path, "w") as f:
-            f.write(board_str)
-        
-    make_board(player1)
-    make_board(player2)
+        board_str = call_bot(player, 0, player.runner().initialize)
+        return board_str[:-1]    #this generates a new line
 
 
     def read_ship_placement(player):
         """
-        Reads the ship placement from the player's .txt file and updates their ship_grid.
+        Gets the player's validated ship placement and updates their board.
+        Bots known to always print the same placement are served from the placement cache
+        instead of running `initialize` again.
         :param player: Player object.
         :return: 0 if successful, -1 if any error occurs.
         """
-        filename = f"{player.name}.txt"
-        file_path = os.path.join(uploads_dir, filename)
         try:
-            with open(file_path, 'r') as file:
-                for line in file:
-                    # Parse the line: <ship_name>,<row1><col1>,<row2><col2>,...,<rowN><colN>
-                    parts = line.strip().split(',')
-                    ship_name = parts[0]
-                    coordinates = parts[1:]
-
-                    # Get the ship details from the player's ships dictionary
-                    ship = player.ships.get(ship_name)
-                    if not ship:
-                        print(f"Error: Ship '{ship_name}' not found in {player.name}'s fleet.")
-                        return -1
-
-                    # Check if the number of coordinates matches the ship's length
-                    if len(coordinates) != ship["length"]:
-                        print(f"Error: Ship '{ship_name}' requires {ship['length']} coordinates, but {len(coordinates)} were provided.")
-                        return -1
-
-                    # Extract rows and columns from coordinates
-                    rows = [coord[0] for coord in coordinates]
-                    cols = [int(coord[1:]) for coord in coordinates]
-
-                    # Check if the ship is placed horizontally, vertically
-                    if all(row == rows[0] for row in rows) and cols == list(range(cols[0], cols[0] + len(cols))):
-                        orientation = 'horizontal'
-                    elif all(col == cols[0] for col in cols) and [ord(row) for row in rows] == list(range(ord(rows[0]), ord(rows[0]) + len(rows))):
-                        orientation = 'vertical'
-                    else:
-                        print(f"Error: Ship '{ship_name}' is not placed horizontally ors vertically.")
-                        return -1
-
-                    # Validate and update coordinates in a single traversal
-                    for coord in coordinates:
-                        row = coord[0]
-                        col = int(coord[1:]) - 1  # Convert to 0-based index
-
-                        # Check if the coordinate is within the grid bounds
-                        if row not in player.ship_grid or col < 0 or col >= 10:
-                            print(f"Error: Coordinate '{coord}' for {player.name}'s {ship_name} is out of bounds.")
-                            return -1
-
-                        # Check if the cell is already occupied
-                        if player.ship_grid[row][col] is not None:
-                            print(f"Error: Coordinate '{coord}' for {player.name}'s {ship_name} overlaps with another ship.")
-                            return -1
-
-                        # Update the board
-                        player.ship_grid[row][col] = ship["symbol"]
-                        ship["positions"].append((row, col + 1))  # Store 1-based positions
-            return 0  # All ships placed successfully
-        except FileNotFoundError:
-            print(f"Error: File '{filename}' not found for {player.name}.")
-            return -1
-        except Exception as e:
-            print(f"Error reading {player.name}'s ship placement file: {e}")
-            return -1
-
-
-    def get_player_move(current_player):
+            digest = file_digest(player.script_path)
+        except OSError:
+            digest = None
+        placement = placement_cache.get(digest) if digest else None
+
+        if placement is None:
+            board_str = make_board(player)
+            try:
+                placement = parse_placement(board_str, player.ships)
+            except PlacementError as e:
+                events.emit("error", player=player.name, message=f"{player.name}'s ship placement is invalid: {e}")
+                return -1
+            if digest:
+                placement_cache.observe(digest, board_str, placement)
+
+        fleets[player] = tuple(tuple(placement[ship_name]) for ship_name in player.ships)
+        for index, ship_name in enumerate(player.ships):
+            cells = placement[ship_name]
+            player.board.place(index, cells)
+            player.ships[ship_name]["positions"].extend((ROWS[cell // SIZE], cell % SIZE + 1) for cell in cells)  # Store 1-based positions
+        return 0  # All ships placed successfully
+
+
+    def get_player_move(current_player, opponent):
         """
         Validates the move generated by the player's script and returns it in a usable format.
+        Bots that support delta moves only receive what changed since their last turn;
+        all other bots get both grids and their full move history.
         :param current_player: The Player object whose turn it is.
+        :param opponent: The Player object representing the opponent.
         :param move_str: The move string returned by the player's script (e.g., "A1", "B2").
         :return: A tuple (row, col) representing the move, or None if the move is invalid.
         """
-        def grid_to_string(attack_grid, ship_grid):
+        def grid_to_string(board):
             """
-            Converts both attack_grid and ship_grid into string representations.
-            :param attack_grid: The attack grid (dictionary of lists).
-            :param ship_grid: The ship grid (dictionary of lists).
+            Converts both the attack grid and the ship grid into string representations.
+            :param board: The player's Board.
             :return: A tuple (attack_grid_str, ship_grid_str) representing both grids as strings.
             """
-            attack_grid_str = ""
-            ship_grid_str = ""
-            
-            # Convert attack_grid to string
-            for row in sorted(attack_grid.keys()):  # Ensure rows are processed in order (A to J)
-                for cell in attack_grid[row]:
-                    if cell is None:
-                        attack_grid_str += "~"  # Unexplored or empty cell
-                    elif cell == 'H':
-                        attack_grid_str += "H"  # Hit
-                    elif cell == 'M':
-                        attack_grid_str += "M"  # Miss
-                attack_grid_str += "\n"  # Newline after each row
-            
-            # Convert ship_grid to string
-            for row in sorted(ship_grid.keys()):  # Ensure rows are processed in order (A to J)
-                for cell in ship_grid[row]:
-                    if cell is None:
-                        ship_grid_str += "~"  # Unexplored or empty cell
-                    else:
-                        ship_grid_str += cell  # Exact ship symbol (e.g., 'C', 'B', etc.)
-                ship_grid_str += "\n"  # Newline after each row
-            
-            # Remove trailing newlines and return as a tuple
-            return attack_grid_str.strip(), ship_grid_str.strip()
-
-
-        attack_grid_string, ship_grid_string = grid_to_string(current_player.attack_grid, current_player.ship_grid)
-
-
-        move_str = subprocess.run(['python', os.path.join(uploads_dir, current_player.script), ship_grid_string, attack_grid_string, ' '.join(current_player.moves_list)], capture_output=True, text = True).stdout
+            return board.attack_string(), board.ship_string()
+
+
+        runner = current_player.runner()
+        turn = len(current_player.moves_list) + 1
+        if runner.supports_delta:
+            move_str = call_bot(current_player, turn, runner.next_move_delta, {
+                "turn": turn,
+                "last_shot": current_player.moves_list[-1] if current_player.moves_list else None,
+                "last_result": current_player.last_result,
+                "sunk_ship": current_player.last_sunk,
+                "opponent_shot": opponent.moves_list[-1] if opponent.moves_list else None,
+            })
+        else:
+            attack_grid_string, ship_grid_string = grid_to_string(current_player.board)
+            move_str = call_bot(current_player, turn, runner.next_move, ship_grid_string, attack_grid_string, ' '.join(current_player.moves_list))
         move_str = move_str[:-1]    #this generates a new line, so removing the last character
         try:
             # Validate the move string format
             if not isinstance(move_str, str) or len(move_str) < 2 or not move_str[0].isalpha() or not move_str[1:].isdigit():
-                print(f"Error: {current_player.name}'s move '{move_str}' is not in the correct format (e.g., 'A1', 'B2').")
+                events.emit("error", player=current_player.name, message=f"{current_player.name}'s move '{move_str}' is not in the correct format (e.g., 'A1', 'B2').")
                 return None
 
             # Extract row and column from the move string
@@ -213,22 +275,19 @@ def start_game(player1, player2):
             col = int(move_str[1:])    # Convert column to integer
 
             # Validate the row and column
-            if row not in current_player.attack_grid or col < 1 or col > 10:
-                print(f"Error: {current_player.name}'s move '{move_str}' is out of bounds.")
+            if row not in ROW_INDEX or col < 1 or col > SIZE:
+                events.emit("error", player=current_player.name, message=f"{current_player.name}'s move '{move_str}' is out of bounds.")
                 return None
 
-            # Convert col to 0-based index
-            col_index = col - 1
-
             # Check if the move has already been tried
-            if current_player.attack_grid[row][col_index] is not None:
-                print(f"Error: {current_player.name}'s move '{move_str}' has already been tried.")
+            if current_player.board.has_fired_at(cell_index(row, col)):
+                events.emit("error", player=current_player.name, message=f"{current_player.name}'s move '{move_str}' has already been tried.")
                 return None
 
             # If all checks pass, return the move as a tuple
             return (row, col)
         except Exception as e:
-            print(f"Error validating {current_player.name}'s move: {e}")
+            events.emit("error", player=current_player.name, message=f"Could not validate {current_player.name}'s move: {e}")
             return None
     
 
@@ -241,84 +300,103 @@ def start_game(player1, player2):
         :return: "hit", "miss", or "sunk" depending on the result of the move.
         """
         row, col = move
-        col_index = col - 1  # Convert to 0-based index
-
-        # Check if the move hits a ship
-        if opponent.ship_grid[row][col_index] is not None:
-            # It's a hit
-            # print("It's a hit.")
-            current_player.attack_grid[row][col_index] = 'H'  # Mark as hit on the attacker's attack_grid
-            ship_symbol = opponent.ship_grid[row][col_index]
-            opponent.ship_grid[row][col_index] = 'X'  # Mark as hit on the opponent's ship_grid
-
-            # Find the ship that was hit
-            for ship_name, ship in opponent.ships.items():
-                if ship["symbol"] == ship_symbol:
-                    # Decrement the ship's health
-                    ship["health"] -= 1
-
-                    # Check if the ship is sunk
-                    if ship["health"] == 0:
-                        opponent.remaining_ships -= 1
-                        return ("sunk", ship_name)
-                    return "hit"
-        else:
-            # It's a miss
-            current_player.attack_grid[row][col_index] = 'M'  # Mark as miss on the attacker's attack_grid
+        cell = cell_index(row, col)
+
+        # Resolve the shot against the opponent's bitboards and mark it on the attacker's
+        result, ship = opponent.board.receive(cell)
+        current_player.board.record_shot(cell, result != MISS)
+        if result == MISS:
             return "miss"
 
+        # The cell -> ship table gives the ship directly, no fleet scan needed
+        ship_name = opponent.board.ship_names[ship]
+        opponent.ships[ship_name]["health"] -= 1
+        if result == SUNK:
+            opponent.remaining_ships -= 1
+            return ("sunk", ship_name)
+        return "hit"
+
+
+    def game_over(winner, loser, reason):
+        events.emit("game_over", winner=winner.name, loser=loser.name, reason=reason,
+                    moves={player1.name: list(player1.moves_list), player2.name: list(player2.moves_list)})
+        if records is not None:
+            records.append(GameRecord(seed, (player1.name, player2.name),
+                                      (fleets.get(player1, ()), fleets.get(player2, ())),
+                                      tuple(shots), 0 if winner is player1 else 1, reason))
+
+    def forfeit(loser, winner, error):
+        """
+        Ends the game because the loser's bot was killed for exceeding a limit.
+        :return: The winner's name.
+        """
+        events.emit("error", player=loser.name, message=f"{loser.name}'s bot was stopped: {error}. {loser.name} forfeits.")
+        winner.wins += 1
+        loser.losses += 1
+        game_over(winner, loser, error.reason)
+        loser.reset_board()
+        winner.reset_board()
+        return winner.name
 
     # Initialize boards for both players
-    if read_ship_placement(player1) == -1:
-        print(f"{player1.name} failed to initialize their board. {player1.name} loses.")
+    try:
+        placed = read_ship_placement(player1)
+    except BotLimitExceeded as e:
+        return forfeit(player1, player2, e)
+    if placed == -1:
+        events.emit("error", player=player1.name, message=f"{player1.name} failed to initialize their board. {player1.name} loses.")
         player1.reset_board()
         return -1
 
-    if read_ship_placement(player2) == -1:
-        print(f"{player2.name} failed to initialize their board. {player2.name} loses.")
+    try:
+        placed = read_ship_placement(player2)
+    except BotLimitExceeded as e:
+        return forfeit(player2, player1, e)
+    if placed == -1:
+        events.emit("error", player=player2.name, message=f"{player2.name} failed to initialize their board. {player2.name} loses.")
         player2.reset_board()
         player1.reset_board()
         return -1
 
-    print("Both Player 1's and Player 2's boards initialized successfully.\n")
-    player1.display_board()
-    player2.display_board()
+    events.emit("game_started", player1=player1.name, player2=player2.name, seed=seed)
     current_player = player1
     opponent = player2
 
     while True:
-        # Display the current state of the boards
-        print(f"\n{current_player.name}'s turn:")
-        current_player.display_board('attack')
-        opponent.display_board('ship')  # For debugging, remove in final version
-
         # Get the current player's move
-        move = get_player_move(current_player)
+        try:
+            move = get_player_move(current_player, opponent)
+        except BotLimitExceeded as e:
+            return forfeit(current_player, opponent, e)
         if move is None:
-            print(f"{current_player.name} made an invalid move. {opponent.name} won.")
             opponent.wins += 1
             current_player.losses += 1
-            print(f"The list of {current_player.name}'s moves: {current_player.moves_list}")
-            print(f"The list of {opponent.name}'s moves: {opponent.moves_list}")
+            game_over(opponent, current_player, "invalid_move")
             current_player.reset_board()
             opponent.reset_board()
             return opponent.name
         
-        current_player.moves_list.append((move[0] + str(move[1])))
+        move_str = move[0] + str(move[1])
+        current_player.moves_list.append(move_str)
+        shots.append(cell_index(*move))
         # Apply the move and check for hits/misses
         result = apply_move(current_player, opponent, move)
+        current_player.last_result = result if isinstance(result, str) else "sunk"
+        current_player.last_sunk = None if isinstance(result, str) else result[1]
         if result == "hit":
-            print(f"{current_player.name} hit a ship at {move}!")
+            events.emit("move", player=current_player.name, move=move_str, result="hit")
+            events.emit("hit", player=current_player.name, opponent=opponent.name, move=move_str)
         elif result == "miss":
-            print(f"{current_player.name} missed at {move}.")
+            events.emit("move", player=current_player.name, move=move_str, result="miss")
         else:
-            print(f"{current_player.name} sunk {opponent.name}'s {result[1]}!")
+            events.emit("move", player=current_player.name, move=move_str, result="sunk")
+            events.emit("sunk", player=current_player.name, opponent=opponent.name, move=move_str, ship=result[1])
 
         # Check if the opponent has lost all ships
         if opponent.remaining_ships == 0:
-            print(f"{current_player.name} has sunk all of {opponent.name}'s ships! {current_player.name} wins!")
             current_player.wins += 1
             opponent.losses += 1
+            game_over(current_player, opponent, "fleet_sunk")
             current_player.reset_board()
             opponent.reset_board()
             return current_player.name
@@ -342,17 +420,12 @@ def start_game(player1, player2):
 #     print(f"{player2.name} wins: " + str(player2.wins))
 #     return winner
 
-def play_bots(bot1:Player,bot2:Player):
+def play_bots(bot1:Player,bot2:Player,events=None,seed=None,records=None,latencies=None):
     '''
     Takes in the Players and returns a winner
     '''
     player1 = bot1
     player2 = bot2
-    print(f"Player 1: {player1.name}")
-    print(f"Player 2: {player2.name}")
     # player1.display_board()
-    winner = start_game(player1, player2)
-    print(f"The winner is {winner}")
-    print(f"{player1.name} wins: " + str(player1.wins))
-    print(f"{player2.name} wins: " + str(player2.wins))
+    winner = start_game(player1, player2, events, seed, records, latencies)
     return winner
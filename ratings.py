@@ -0,0 +1,109 @@
+# ratings.py
+"""
+Glicko ratings for bots, updated game by game.
+
+Every bot carries a rating and a rating deviation (RD), the uncertainty of that
+rating. Each finished game updates both players in constant time from their
+current values alone, so the global leaderboard is a sorted read of the `bots`
+table rather than a replay of past tournaments.
+
+New bots start at RATING_INITIAL with RATING_INITIAL_DEVIATION. Every game
+shrinks the deviation (never below RATING_MIN_DEVIATION), and it grows back by
+RATING_DEVIATION_GROWTH per idle day, so a bot that has not played for a while
+moves faster again. Games whose boards could not be set up (no winner) are not
+rated.
+"""
+import math
+import os
+from datetime import datetime
+from models import Bot
+
+# Match the column defaults on models.Bot
+RATING_INITIAL = 1500.0
+RATING_INITIAL_DEVIATION = 350.0
+RATING_MIN_DEVIATION = float(os.getenv("RATING_MIN_DEVIATION", "30"))
+# About 35 takes a settled deviation of 50 back to 350 after 100 idle days
+RATING_DEVIATION_GROWTH = float(os.getenv("RATING_DEVIATION_GROWTH", "35"))
+
+Q = math.log(10) / 400
+
+
+def g(deviation):
+    """
+    :return: How much a result against an opponent with this deviation counts (1 when certain).
+    """
+    return 1 / math.sqrt(1 + 3 * (Q * deviation) ** 2 / math.pi ** 2)
+
+
+def expected_score(rating, opponent_rating, opponent_deviation):
+    """
+    :return: The probability that a player with `rating` beats the opponent.
+    """
+    return 1 / (1 + 10 ** (-g(opponent_deviation) * (rating - opponent_rating) / 400))
+
+
+def current_deviation(deviation, rated_at, now):
+    """
+    :return: A deviation grown for the days since the bot's last rated game.
+    """
+    if deviation is None:
+        return RATING_INITIAL_DEVIATION
+    if rated_at is None:
+        return deviation
+    days = max(0.0, (now - rated_at).total_seconds() / 86400)
+    return min(math.sqrt(deviation ** 2 + RATING_DEVIATION_GROWTH ** 2 * days), RATING_INITIAL_DEVIATION)
+
+
+def glicko_update(rating, deviation, opponent_rating, opponent_deviation, score):
+    """
+    Applies one game to a player's rating.
+    :param score: 1 for a win, 0.5 for a draw, 0 for a loss.
+    :return: A tuple (rating, deviation) after the game.
+    """
+    impact = g(opponent_deviation)
+    expected = expected_score(rating, opponent_rating, opponent_deviation)
+    inverse_variance = Q ** 2 * impact ** 2 * expected * (1 - expected)
+    precision = 1 / deviation ** 2 + inverse_variance
+    rating += Q / precision * impact * (score - expected)
+    deviation = max(math.sqrt(1 / precision), RATING_MIN_DEVIATION)
+    return rating, deviation
+
+
+def record_game(bot1, bot2, score1, now=None):
+    """
+    Updates the ratings of two Bot rows after a game. Both updates use the ratings from
+    before the game.
+    :param score1: bot1's result: 1 for a win, 0.5 for a draw, 0 for a loss.
+    """
+    now = now or datetime.utcnow()
+    rating1 = bot1.rating if bot1.rating is not None else RATING_INITIAL
+    rating2 = bot2.rating if bot2.rating is not None else RATING_INITIAL
+    deviation1 = current_deviation(bot1.rating_deviation, bot1.rated_at, now)
+    deviation2 = current_deviation(bot2.rating_deviation, bot2.rated_at, now)
+
+    bot1.rating, bot1.rating_deviation = glicko_update(rating1, deviation1, rating2, deviation2, score1)
+    bot2.rating, bot2.rating_deviation = glicko_update(rating2, deviation2, rating1, deviation1, 1 - score1)
+    for bot in (bot1, bot2):
+        bot.rated_games = (bot.rated_games or 0) + 1
+        bot.rated_at = now
+
+
+def record_results(db, bots, results):
+    """
+    Rates every game of a match or tournament, in the order they were played. The caller commits.
+    :param bots: The Bot rows that played, keyed by engine player name.
+    :param results: An iterable of tournament.GameResult.
+    :return: The number of games rated.
+    """
+    # Lock the rows so workers finishing at the same time cannot overwrite each other's updates
+    ids = [bot.id for bot in bots.values()]
+    db.query(Bot).filter(Bot.id.in_(ids)).populate_existing().with_for_update().all()
+
+    now = datetime.utcnow()
+    rated = 0
+    for result in sorted(results, key=lambda r: (r.pairing, r.game)):
+        if result.winner is None:
+            continue
+        record_game(bots[result.player1], bots[result.player2], 1 if result.winner == result.player1 else 0, now)
+        rated += 1
+    return rated
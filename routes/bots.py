@@ -4,13 +4,17 @@ from sqlalchemy import UUID
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import os
-import shutil
-from datetime import datetime
-from models import User, Bot
+from datetime import datetime, timedelta
+from models import User, Bot, BotLatencyDaily
 from database import get_db
 from auth import require_user
+from bot_loader import compile_bot
+import bot_stats
 import uuid
 from pathlib import Path
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/bots", tags=["Bots"])
 
@@ -32,10 +36,23 @@ async def upload_bot(
     unique_filename = f"{uuid.uuid4()}_{file.filename}"
     file_path = os.path.join(UPLOAD_DIR, unique_filename)
     
+    # Compile once now: broken bots are rejected here instead of forfeiting every game,
+    # and the cached bytecode spares the engine recompiling the bot on each call
+    source = await file.read()
+    try:
+        compile_bot(source, file_path)
+    except (SyntaxError, ValueError) as e:
+        await file.close()
+        line = f"line {e.lineno}: " if getattr(e, "lineno", None) else ""
+        raise HTTPException(status_code=400, detail=f"Bot does not compile: {line}{getattr(e, 'msg', None) or e}")
+    except OSError as e:
+        # The source compiled but the bytecode cache could not be written; the bot is compiled on first load
+        logger.warning(f"Could not cache bytecode for {unique_filename}: {e}")
+    
     try:
         # Save file to disk
         with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+            buffer.write(source)
         
         # Create database record
         bot = Bot(
@@ -89,6 +106,29 @@ async def list_bots(
         "description": bot.description
     } for bot in bots]
 
+@router.get("/leaderboard", response_model=List[dict])
+async def get_leaderboard(
+    limit: int = 50,
+    offset: int = 0,
+    min_games: int = 1,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_user)
+):
+    """List active bots of all users by rating, highest first"""
+    bots = db.query(Bot).filter(
+        Bot.is_active == True,
+        Bot.rated_games >= max(min_games, 1)
+    ).order_by(Bot.rating.desc(), Bot.rated_games.desc()).offset(offset).limit(min(limit, 500)).all()
+    
+    return [{
+        "rank": offset + index + 1,
+        "id": bot.id,
+        "filename": bot.original_filename,
+        "rating": round(bot.rating, 1),
+        "rating_deviation": round(bot.rating_deviation, 1),
+        "rated_games": bot.rated_games
+    } for index, bot in enumerate(bots)]
+
 @router.get("/{bot_id}", response_model=dict)
 async def get_bot(
     bot_id: str,
@@ -109,7 +149,42 @@ async def get_bot(
         "filename": bot.original_filename,
         "upload_date": bot.upload_date,
         "description": bot.description,
-        "is_active": bot.is_active
+        "is_active": bot.is_active,
+        "is_trusted": bool(bot.is_trusted),
+        "rating": bot.rating,
+        "rating_deviation": bot.rating_deviation,
+        "rated_games": bot.rated_games or 0
+    }
+
+@router.get("/{bot_id}/stats", response_model=dict)
+async def get_bot_stats(
+    bot_id: str,
+    days: int = 30,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_user)
+):
+    """Get a bot's initialize and move latency percentiles per day and over the last `days` days"""
+    bot = db.query(Bot).filter(
+        Bot.id == bot_id,
+        Bot.uploader_id == current_user.id
+    ).first()
+    
+    if not bot:
+        raise HTTPException(status_code=404, detail="Bot not found")
+    if days < 1:
+        raise HTTPException(status_code=400, detail="days must be at least 1")
+    
+    since = datetime.utcnow().date() - timedelta(days=min(days, 366) - 1)
+    rows = db.query(BotLatencyDaily).filter(
+        BotLatencyDaily.bot_id == bot.id,
+        BotLatencyDaily.day >= since
+    ).order_by(BotLatencyDaily.day).all()
+    
+    return {
+        "id": bot.id,
+        "filename": bot.original_filename,
+        "since": since.isoformat(),
+        "latency": bot_stats.daily_view(rows)
     }
 
 @router.delete("/{bot_id}", response_model=dict)
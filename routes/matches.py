@@ -1,27 +1,59 @@
 # routes/matches.py
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
-from typing import List
-from datetime import datetime
+from typing import List, Optional
 from models import Match, Bot, User
-from database import get_db
-from auth import require_user
-from tournament import run_tournament
+from database import SessionLocal, get_db
+from starlette.concurrency import run_in_threadpool
+from auth import require_user, session_user
+from jobs import submit_job
+from live import END_OF_STREAM, hub
+from sprt import SPRT_ALPHA, SPRT_BETA, SPRT_MAX_GAMES
+from player import FLEET
+import gamelog
+import bot_stats
 import json
 
 router = APIRouter(prefix="/matches", tags=["Matches"])
 
+# Seconds between keep-alive messages on an idle live stream
+LIVE_KEEPALIVE_SECONDS = 15
+# Match statuses a live stream waits on
+LIVE_STATUSES = ("pending", "running")
 
-@router.post("/", response_model=dict)
+
+@router.post("/", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
 async def create_match(
     bot1_id: str,
     bot2_id: str,
+    background_tasks: BackgroundTasks,
     rounds: int = 3,
+    series: str = "fixed",
+    alpha: float = SPRT_ALPHA,
+    beta: float = SPRT_BETA,
+    max_games: int = SPRT_MAX_GAMES,
+    seed: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_user)
 ):
-    """Create and run a match between two bots"""
+    """Create a match between two bots and queue it to run in the background.
+    A "fixed" series plays `rounds` games; an "sprt" series stops as soon as a sequential
+    test names a winner with error rates `alpha` and `beta`, after at most `max_games` games.
+    Passing the `seed` of an earlier match replays the same games."""
+    if seed is not None and not 0 <= seed < 2 ** 31:
+        raise HTTPException(status_code=400, detail="seed must be between 0 and 2**31 - 1")
+    if series not in ("fixed", "sprt"):
+        raise HTTPException(status_code=400, detail="series must be 'fixed' or 'sprt'")
+    if series == "sprt":
+        if not (0 < alpha < 0.5 and 0 < beta < 0.5):
+            raise HTTPException(status_code=400, detail="alpha and beta must be between 0 and 0.5")
+        if max_games < 1:
+            raise HTTPException(status_code=400, detail="max_games must be at least 1")
+        rounds = max_games
+
     # Validate bots exist
     bot1 = db.query(Bot).filter(Bot.id == bot1_id).first()
     bot2 = db.query(Bot).filter(Bot.id == bot2_id).first()
@@ -36,6 +68,10 @@ async def create_match(
         bot1_id=bot1_id,
         bot2_id=bot2_id,
         rounds_to_play=rounds,
+        series=series,
+        sprt_alpha=alpha if series == "sprt" else None,
+        sprt_beta=beta if series == "sprt" else None,
+        seed=seed,
         status="pending"
     )
     
@@ -43,56 +79,24 @@ async def create_match(
     db.commit()
     db.refresh(match)
     
-    # Run the match immediately
-    try:
-        match.status = "running"
-        match.started_at = datetime.utcnow()
-        db.commit()
-        print(f"Match started between {bot1.filename} and {bot2.filename}")
-        # Get bot filenames for the tournament engine
-        bot_files = [bot1.filename, bot2.filename]
-        rankings = run_tournament(bot_files, rounds)
-        print(f"Match completed with rankings: {rankings}")
-        # Process results
-        match.status = "completed"
-        match.completed_at = datetime.utcnow()
-        
-        if len(rankings) >= 2:
-            winner_filename = rankings[0][1]
-            winner_stats = rankings[0][2]
-            loser_stats = rankings[1][2]
-            
-            # Determine winner
-            winner_bot = bot1 if bot1.filename == winner_filename else bot2
-            match.winner_id = winner_bot.id
-            match.bot1_wins = winner_stats if winner_bot == bot1 else loser_stats
-            match.bot2_wins = winner_stats if winner_bot == bot2 else loser_stats
-            
-        
-        db.commit()
-        
-        return {
-            "id": match.id,
-            "status": match.status,
-            "bot1": {
-                "id": bot1.id,
-                "name": bot1.original_filename,
-                "wins": match.bot1_wins
-            },
-            "bot2": {
-                "id": bot2.id,
-                "name": bot2.original_filename,
-                "wins": match.bot2_wins
-            },
-            "winner_id": match.winner_id,
-            "created_at": match.created_at,
-            "completed_at": match.completed_at
-        }
+    # Queue the games for a worker; results are read back with GET /matches/{id}
+    submit_job(db, background_tasks, "match", match.id)
     
-    except Exception as e:
-        match.status = "failed"
-        db.commit()
-        raise HTTPException(status_code=500, detail=f"Match failed: {str(e)}")
+    return {
+        "id": match.id,
+        "status": match.status,
+        "bot1": {
+            "id": bot1.id,
+            "name": bot1.original_filename
+        },
+        "bot2": {
+            "id": bot2.id,
+            "name": bot2.original_filename
+        },
+        "rounds_to_play": match.rounds_to_play,
+        "series": match.series,
+        "created_at": match.created_at
+    }
 
 @router.get("/", response_model=List[dict])
 async def list_matches(
@@ -135,7 +139,7 @@ async def list_matches(
 
 @router.get("/{match_id}", response_model=dict)
 async def get_match_details(
-    match_id: int,
+    match_id: str,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_user)
 ):
@@ -170,27 +174,175 @@ async def get_match_details(
             "name": match.winner.original_filename
         } if match.winner else None,
         "rounds_to_play": match.rounds_to_play,
+        "series": match.series or "fixed",
+        "games_played": match.games_played,
+        "seed": match.seed,
         "created_at": match.created_at,
         "started_at": match.started_at,
         "completed_at": match.completed_at
     }
     
-    # Include game logs if available
+    # Include game logs if available, rendered from the binary log on demand
     if match.game_logs:
         try:
-            response["game_logs"] = json.loads(match.game_logs)
-        except:
-            response["game_logs"] = match.game_logs
+            response["game_logs"] = gamelog.json_view(
+                match.game_logs,
+                (match.bot1.original_filename, match.bot2.original_filename),
+                list(FLEET)
+            )
+        except ValueError:
+            response["game_logs"] = match.game_logs if isinstance(match.game_logs, str) else None
+
+    # Per-bot initialize and move latency over the match and per game; absent for cached matches
+    if match.latency:
+        response["latency"] = bot_stats.match_view(match.latency)
     
     return response
 
-@router.post("/{match_id}/rematch", response_model=dict)
+def live_status(db, match_id, creator_id):
+    """
+    :param creator_id: Id of the user watching; only their own matches can be watched.
+    :return: The first event of a live stream, or None if the match does not exist or is not theirs.
+    """
+    try:
+        match_uuid = uuid.UUID(str(match_id))
+    except ValueError:
+        return None
+    match = db.query(Match).filter(Match.id == match_uuid, Match.creator_id == creator_id).first()
+    if not match:
+        return None
+    return {
+        "event": "status",
+        "match_id": str(match.id),
+        "status": match.status,
+        "bot1_wins": match.bot1_wins,
+        "bot2_wins": match.bot2_wins
+    }
+
+
+def read_live_status(match_id, creator_id):
+    """
+    Reads live_status with a session of its own that is closed right away, so a stream
+    never holds a pooled connection while it waits.
+    """
+    db = SessionLocal()
+    try:
+        return live_status(db, match_id, creator_id)
+    finally:
+        db.close()
+
+
+async def subscribe_live(match_id, creator_id):
+    """
+    Subscribes to a match's events, then reads its status. Reading after subscribing means a
+    match that finishes in between is seen as finished rather than waited on.
+    :param creator_id: Id of the user watching.
+    :return: A tuple (subscription, status event); both are None if the user has no such match.
+    """
+    current = await run_in_threadpool(read_live_status, match_id, creator_id)
+    if current is None:
+        return None, None
+    subscription = hub.subscribe(current["match_id"])
+    current = await run_in_threadpool(read_live_status, match_id, creator_id) or current
+    return subscription, current
+
+
+async def still_live(match_id, creator_id):
+    """
+    Re-reads a match's status on an idle stream. Matches played by a separate worker process
+    never close this process's hub topic, so their streams end here instead.
+    :return: The latest status event, and whether the stream should keep waiting.
+    """
+    latest = await run_in_threadpool(read_live_status, match_id, creator_id)
+    return latest, latest is not None and latest["status"] in LIVE_STATUSES
+
+
+@router.websocket("/{match_id}/ws")
+async def watch_match_ws(
+    websocket: WebSocket,
+    match_id: str
+):
+    """Stream a match's moves, hits and sunk ships as JSON messages while it is played.
+    The WebSocket is authenticated by the session cookie; only the match's creator can watch."""
+    current_user = session_user(websocket)
+    if not current_user:
+        await websocket.close(code=4401)
+        return
+    subscription, current = await subscribe_live(match_id, current_user.id)
+    if current is None:
+        await websocket.close(code=4404)
+        return
+    await websocket.accept()
+    try:
+        await websocket.send_json(current)
+        while current["status"] in LIVE_STATUSES:
+            try:
+                event = await subscription.get(LIVE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                latest, live = await still_live(match_id, current_user.id)
+                if not live:
+                    if latest is not None:
+                        await websocket.send_json(latest)
+                    break
+                await websocket.send_json({"event": "keepalive"})
+                continue
+            if event is END_OF_STREAM:
+                break
+            await websocket.send_json(event)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.unsubscribe(subscription)
+
+
+@router.get("/{match_id}/events")
+async def watch_match_sse(
+    match_id: str,
+    request: Request,
+    current_user: User = Depends(require_user)
+):
+    """Stream a match's moves, hits and sunk ships as Server-Sent Events while it is played.
+    Only the match's creator can watch."""
+    subscription, current = await subscribe_live(match_id, current_user.id)
+    if current is None:
+        raise HTTPException(status_code=404, detail="Match not found")
+
+    async def stream():
+        try:
+            yield f"event: status\ndata: {json.dumps(current)}\n\n"
+            while current["status"] in LIVE_STATUSES:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event = await subscription.get(LIVE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    latest, live = await still_live(match_id, current_user.id)
+                    if not live:
+                        if latest is not None:
+                            yield f"event: status\ndata: {json.dumps(latest)}\n\n"
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                if event is END_OF_STREAM:
+                    break
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            hub.unsubscribe(subscription)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.post("/{match_id}/rematch", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
 async def create_rematch(
-    match_id: int,
+    match_id: str,
+    background_tasks: BackgroundTasks,
+    same_seed: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_user)
 ):
-    """Create a rematch using the same bots from a previous match"""
+    """Create a rematch using the same bots from a previous match. It plays new games unless
+    `same_seed` is set; replaying the original match's seed lets unchanged deterministic bots
+    get their memoized result back."""
     original_match = db.query(Match).filter(
         Match.id == match_id,
         Match.creator_id == current_user.id
@@ -203,7 +355,13 @@ async def create_rematch(
     return await create_match(
         bot1_id=original_match.bot1_id,
         bot2_id=original_match.bot2_id,
+        background_tasks=background_tasks,
         rounds=original_match.rounds_to_play,
+        series=original_match.series or "fixed",
+        alpha=original_match.sprt_alpha or SPRT_ALPHA,
+        beta=original_match.sprt_beta or SPRT_BETA,
+        max_games=original_match.rounds_to_play,
+        seed=original_match.seed if same_seed else None,
         db=db,
         current_user=current_user
     )
\ No newline at end of file
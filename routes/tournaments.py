@@ -1,13 +1,14 @@
 # routes/tournaments.py
-from fastapi import APIRouter, Depends, HTTPException, status
+import uuid
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.orm import Session, joinedload
-from typing import List
-from datetime import datetime
+from typing import List, Optional
 from models import Tournament, TournamentEntry, TournamentResult, Bot, User
 from database import get_db
 from auth import require_user
-from tournament import run_tournament
-import json
+from jobs import bot_name, submit_job, TOURNAMENT_FORMATS
+from player import FLEET
+import gamelog
 
 router = APIRouter()
 
@@ -18,16 +19,28 @@ async def create_tournament(
     name: str,
     description: str = None,
     rounds: int = 3,
-    bot_ids: List[int] = None,
+    bot_ids: List[str] = None,
+    format: str = "round_robin",
+    seed: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_user)
 ):
-    """Create a new tournament"""
+    """Create a new tournament.
+
+    Passing the `seed` of an earlier tournament between the same bots replays the same games."""
+    if format not in TOURNAMENT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown tournament format; expected one of: {', '.join(TOURNAMENT_FORMATS)}")
+    if seed is not None and not 0 <= seed < 2 ** 31:
+        raise HTTPException(status_code=400, detail="seed must be between 0 and 2**31 - 1")
+
     tournament = Tournament(
+        id=uuid.uuid4(),
         name=name,
         description=description,
         creator_id=current_user.id,
         rounds=rounds,
+        format=format,
+        seed=seed,
         status="pending"
     )
     
@@ -43,6 +56,7 @@ async def create_tournament(
                 continue
             
             entry = TournamentEntry(
+                id=uuid.uuid4(),
                 tournament_id=tournament.id,
                 bot_id=bot_id
             )
@@ -56,13 +70,15 @@ async def create_tournament(
         "description": tournament.description,
         "created_at": tournament.created_at,
         "status": tournament.status,
-        "rounds": tournament.rounds
+        "rounds": tournament.rounds,
+        "format": tournament.format,
+        "seed": tournament.seed
     }
 
 @router.post("/{tournament_id}/register", response_model=dict)
 async def register_bot_to_tournament(
-    tournament_id: int,
-    bot_id: int,
+    tournament_id: str,
+    bot_id: str,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_user)
 ):
@@ -88,6 +104,7 @@ async def register_bot_to_tournament(
         raise HTTPException(status_code=400, detail="Bot already registered to this tournament")
     
     entry = TournamentEntry(
+        id=uuid.uuid4(),
         tournament_id=tournament_id,
         bot_id=bot_id
     )
@@ -97,13 +114,14 @@ async def register_bot_to_tournament(
     
     return {"message": "Bot registered successfully"}
 
-@router.post("/{tournament_id}/start", response_model=dict)
+@router.post("/{tournament_id}/start", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
 async def start_tournament(
-    tournament_id: int,
+    tournament_id: str,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_user)
 ):
-    """Start running a tournament"""
+    """Queue a tournament to run in the background"""
     tournament = db.query(Tournament).filter(
         Tournament.id == tournament_id,
         Tournament.creator_id == current_user.id
@@ -116,63 +134,19 @@ async def start_tournament(
         raise HTTPException(status_code=400, detail="Tournament already started or completed")
     
     # Get all registered bots
-    entries = db.query(TournamentEntry).options(
-        joinedload(TournamentEntry.bot)
-    ).filter(TournamentEntry.tournament_id == tournament_id).all()
+    entry_count = db.query(TournamentEntry).filter(TournamentEntry.tournament_id == tournament_id).count()
     
-    if len(entries) < 2:
+    if entry_count < 2:
         raise HTTPException(status_code=400, detail="Need at least 2 bots to start tournament")
     
-    # Update tournament status
-    tournament.status = "running"
-    tournament.started_at = datetime.utcnow()
-    db.commit()
-    
-    # Get bot filenames for the tournament
-    bot_files = [entry.bot.filename for entry in entries]
+    # Queue the games for a worker; the job moves the status to running and then completed
+    submit_job(db, background_tasks, "tournament", tournament.id)
     
-    try:
-        # Run the tournament
-        rankings = run_tournament(bot_files, tournament.rounds)
-        
-        # Save results
-        for rank, (bot_name, stats) in enumerate(rankings, 1):
-            # Find the entry for this bot
-            entry = next((e for e in entries if e.bot.filename == bot_name), None)
-            if not entry:
-                continue
-                
-            result = TournamentResult(
-                tournament_id=tournament_id,
-                entry_id=entry.id,
-                rank=rank,
-                wins=stats.get('wins', 0),
-                losses=stats.get('losses', 0),
-                score=stats.get('score', 0)
-            )
-            
-            db.add(result)
-        
-        # Mark tournament as completed
-        tournament.status = "completed"
-        tournament.completed_at = datetime.utcnow()
-        db.commit()
-        
-        return {
-            "status": "completed",
-            "rankings": [{
-                "rank": rank,
-                "bot_name": bot_name,
-                "wins": stats.get('wins', 0),
-                "losses": stats.get('losses', 0),
-                "score": stats.get('score', 0)
-            } for rank, (bot_name, stats) in enumerate(rankings, 1)]
-        }
-    
-    except Exception as e:
-        tournament.status = "failed"
-        db.commit()
-        raise HTTPException(status_code=500, detail=f"Tournament failed: {str(e)}")
+    return {
+        "id": tournament.id,
+        "status": tournament.status,
+        "entries": entry_count
+    }
 
 @router.get("/", response_model=List[dict])
 async def list_tournaments(
@@ -195,13 +169,15 @@ async def list_tournaments(
         "created_at": t.created_at,
         "status": t.status,
         "rounds": t.rounds,
+        "format": t.format,
+        "seed": t.seed,
         "started_at": t.started_at,
         "completed_at": t.completed_at
     } for t in tournaments]
 
 @router.get("/{tournament_id}", response_model=dict)
 async def get_tournament_details(
-    tournament_id: int,
+    tournament_id: str,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_user)
 ):
@@ -237,6 +213,8 @@ async def get_tournament_details(
         "created_at": tournament.created_at,
         "status": tournament.status,
         "rounds": tournament.rounds,
+        "format": tournament.format,
+        "seed": tournament.seed,
         "started_at": tournament.started_at,
         "completed_at": tournament.completed_at,
         "entries": [{
@@ -245,4 +223,28 @@ async def get_tournament_details(
             "registered_at": e.registered_at
         } for e in entries],
         "results": results
-    }
\ No newline at end of file
+    }
+
+@router.get("/{tournament_id}/games", response_model=List[dict])
+async def get_tournament_games(
+    tournament_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_user)
+):
+    """Get the game logs of a completed tournament: every game's seed, both fleets and every shot"""
+    tournament = db.query(Tournament).filter(Tournament.id == tournament_id).first()
+
+    if not tournament:
+        raise HTTPException(status_code=404, detail="Tournament not found")
+
+    if not tournament.game_logs or not tournament.game_index:
+        return []
+
+    entries = db.query(TournamentEntry).options(
+        joinedload(TournamentEntry.bot)
+    ).filter(TournamentEntry.tournament_id == tournament_id).all()
+
+    # Logs are rendered from the binary format on demand, with the bots' uploaded names
+    names = {bot_name(e.bot): e.bot.original_filename for e in entries}
+    return gamelog.tournament_view(tournament.game_logs, tournament.game_index, names, list(FLEET))
+
@@ -0,0 +1,79 @@
+# schema.py
+"""
+Brings an existing database up to date with models.py when the API or a worker starts.
+
+Base.metadata.create_all only creates missing tables and never alters ones that
+already exist, so a deployment created before a column was added would fail on
+every query touching it. upgrade_schema() runs create_all, then
+
+    - adds every column models.py has and the table lacks, with the model's
+      default so existing rows get it too
+    - creates the indexes models.py declares and the database lacks
+    - changes the column types listed in TYPE_CHANGES
+
+Nothing is dropped or renamed. SQLite cannot change a column's type; its
+columns accept any value, so local SQLite databases keep the old declared type.
+"""
+import logging
+from sqlalchemy import Float, LargeBinary, inspect, literal, text
+from database import Base
+import models  # noqa: F401 -- registers the tables on Base.metadata
+
+logger = logging.getLogger(__name__)
+
+# (table, column) -> (type the column must have, PostgreSQL USING expression or None)
+TYPE_CHANGES = {
+    # Game logs were JSON text before the binary format; gamelog.json_view still reads them
+    ("matches", "game_logs"): (LargeBinary, "convert_to(game_logs, 'UTF8')"),
+    # Swiss series draws score half a point
+    ("tournament_results", "score"): (Float, None),
+}
+
+
+def column_ddl(column, dialect):
+    """
+    :return: The column's definition for ALTER TABLE ... ADD COLUMN, with its scalar default if any.
+    """
+    ddl = f"{column.name} {column.type.compile(dialect=dialect)}"
+    default = column.default
+    if default is not None and default.is_scalar:
+        value = literal(default.arg, column.type).compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+        ddl += f" DEFAULT {value}"
+    return ddl
+
+
+def upgrade_schema(engine):
+    """
+    Creates missing tables and adds missing columns and indexes, then applies TYPE_CHANGES.
+    :param engine: The SQLAlchemy engine of the database to upgrade.
+    """
+    Base.metadata.create_all(bind=engine)
+    dialect = engine.dialect
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"]: column for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    logger.info(f"Adding column {table.name}.{column.name}")
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl(column, dialect)}"))
+
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    logger.info(f"Creating index {index.name}")
+                    index.create(bind=conn)
+
+            if dialect.name != "postgresql":
+                continue
+            for (table_name, column_name), (new_type, using) in TYPE_CHANGES.items():
+                if table_name != table.name or column_name not in existing:
+                    continue
+                if isinstance(existing[column_name]["type"], new_type):
+                    continue
+                logger.info(f"Changing the type of {table_name}.{column_name}")
+                ddl = table.columns[column_name].type.compile(dialect=dialect)
+                sql = f"ALTER TABLE {table_name} ALTER COLUMN {column_name} TYPE {ddl}"
+                if using:
+                    sql += f" USING {using}"
+                conn.execute(text(sql))
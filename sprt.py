@@ -0,0 +1,66 @@
+# sprt.py
+"""
+Sequential probability ratio test for adaptive match series.
+
+A fixed best-of-N keeps playing after one bot has clearly won, and can be too
+short to separate two close bots. An adaptive series plays one game at a time
+and stops as soon as Wald's SPRT decides between
+
+    H1: bot1 wins a game with probability 0.5 + SPRT_MARGIN
+    H2: bot2 wins a game with probability 0.5 + SPRT_MARGIN
+
+Each win moves the log-likelihood ratio by the same step towards its bot. The
+test stops at ln((1 - beta) / alpha) (bot1 wins) or ln(beta / (1 - alpha)) (bot2
+wins), where alpha is the chance of wrongly naming bot1 and beta of wrongly
+naming bot2. With the defaults a bot that wins every game is named after 4 games;
+an even matchup plays on until the hard maximum.
+"""
+import math
+import os
+
+SPRT_ALPHA = float(os.getenv("SPRT_ALPHA", "0.05"))
+SPRT_BETA = float(os.getenv("SPRT_BETA", "0.05"))
+SPRT_MARGIN = float(os.getenv("SPRT_MARGIN", "0.2"))
+SPRT_MAX_GAMES = int(os.getenv("SPRT_MAX_GAMES", "50"))
+
+
+class SequentialTest:
+    """
+    Tracks one adaptive series between two players, game by game.
+    """
+
+    def __init__(self, player1, player2, alpha=None, beta=None, margin=None):
+        """
+        :param player1: Engine name of the first bot.
+        :param player2: Engine name of the second bot.
+        :param alpha: Error rate for naming player1 when player2 is the better bot.
+        :param beta: Error rate for naming player2 when player1 is the better bot.
+        :param margin: How far from 50% the better bot's win rate is assumed to be.
+        """
+        alpha = alpha or SPRT_ALPHA
+        beta = beta or SPRT_BETA
+        margin = margin or SPRT_MARGIN
+        self.player1 = player1
+        self.player2 = player2
+        self.step = math.log((0.5 + margin) / (0.5 - margin))
+        self.upper = math.log((1 - beta) / alpha)
+        self.lower = math.log(beta / (1 - alpha))
+        self.llr = 0.0
+        self.winner = None
+
+    def record(self, result):
+        """
+        Adds a finished game to the test. Games without a winner leave it unchanged.
+        :param result: A tournament.GameResult.
+        :return: True once the test has named a winner.
+        """
+        if self.winner is None:
+            if result.winner == self.player1:
+                self.llr += self.step
+            elif result.winner == self.player2:
+                self.llr -= self.step
+            if self.llr >= self.upper:
+                self.winner = self.player1
+            elif self.llr <= self.lower:
+                self.winner = self.player2
+        return self.winner is not None
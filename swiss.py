@@ -0,0 +1,138 @@
+"""
+Swiss-system tournaments.
+
+Instead of every bot playing every other bot, the field plays about log2(N)
+rounds. Each round pairs bots with similar scores that have not met yet, and
+every pairing plays a series of num_games games. A series win is worth 1 point
+and a drawn series 0.5 each. With an odd field the lowest-ranked bot that has
+not had a bye sits the round out and gets 1 point.
+
+A 200-bot field with 3 games per series plays 8 rounds of 100 series, 2,400
+games, where a round robin would play 59,700.
+"""
+import math
+from collections import defaultdict
+from tournament import play_pairings
+
+# Pairing attempts before falling back to allowing rematches
+MAX_PAIRING_STEPS = 20000
+
+
+def swiss_rounds(num_bots):
+    """
+    :return: Number of rounds needed to separate num_bots bots, ceil(log2(N)).
+    """
+    return max(1, math.ceil(math.log2(num_bots))) if num_bots > 1 else 0
+
+
+def pair_round(ranked, played):
+    """
+    Pairs bots in standings order with the closest-ranked opponent they have not played.
+    :param ranked: Bot files from first to last place.
+    :param played: A set of frozenset({bot1, bot2}) pairs that already met.
+    :return: A list of (bot1, bot2) tuples. Rematches only happen if no pairing without one exists.
+    """
+    steps = [0]
+
+    def search(remaining):
+        if not remaining:
+            return []
+        steps[0] += 1
+        if steps[0] > MAX_PAIRING_STEPS:
+            return None
+        first, rest = remaining[0], remaining[1:]
+        for index, opponent in enumerate(rest):
+            if frozenset((first, opponent)) in played:
+                continue
+            tail = search(rest[:index] + rest[index + 1:])
+            if tail is not None:
+                return [(first, opponent)] + tail
+        return None
+
+    pairings = search(list(ranked))
+    if pairings is None:
+        # Too few fresh opponents left; pair neighbours in order
+        pairings = list(zip(ranked[::2], ranked[1::2]))
+    return pairings
+
+
+def standings(bot_files, scores, wins, opponents):
+    """
+    Orders bots by score, then Buchholz (sum of their opponents' scores), then game wins,
+    then their original order.
+    :return: The bot files from first to last place.
+    """
+    order = {bot: index for index, bot in enumerate(bot_files)}
+    buchholz = {bot: sum(scores[opponent] for opponent in opponents[bot]) for bot in bot_files}
+    return sorted(bot_files, key=lambda bot: (-scores[bot], -buchholz[bot], -wins[bot], order[bot]))
+
+
+def play_swiss(bot_files, num_games, rounds=None, events=None, workers=None, trusted=(), seed=None):
+    """
+    Plays a Swiss tournament. Series within a round run concurrently on `workers` processes.
+    :param bot_files: Bot file names inside the uploads directory, in seeding order.
+    :param num_games: Number of games per series.
+    :param rounds: Number of rounds; defaults to swiss_rounds(len(bot_files)).
+    :param events: Optional EventSink for game events.
+    :param workers: Number of worker processes; see tournament.play_round_robin.
+    :param trusted: Bot file names allowed to run in-process; see tournament.play_round_robin.
+    :param seed: Seed the game seeds are derived from; see tournament.play_round_robin.
+    :return: A tuple (results, rankings, scores): every GameResult, a list of
+             (rank, bot name, wins) tuples like tournament.rank_results, and a dict
+             mapping bot name to Swiss points.
+    """
+    rounds = swiss_rounds(len(bot_files)) if rounds is None else rounds
+    scores = defaultdict(float)
+    wins = defaultdict(int)
+    opponents = defaultdict(list)
+    played = set()
+    byes = set()
+    results = []
+    # Pairing indices keep counting across rounds; `played` stops growing once rematches start
+    next_pairing = 0
+
+    for _ in range(rounds):
+        ranked = standings(bot_files, scores, wins, opponents)
+        if len(ranked) % 2:
+            bye = next((bot for bot in reversed(ranked) if bot not in byes), ranked[-1])
+            byes.add(bye)
+            scores[bye] += 1
+            ranked.remove(bye)
+
+        pairings = pair_round(ranked, played)
+        round_results = play_pairings(pairings, num_games, events, workers, trusted=trusted,
+                                      first_pairing=next_pairing, seed=seed)
+        next_pairing += len(pairings)
+        for bot1, bot2 in pairings:
+            played.add(frozenset((bot1, bot2)))
+            opponents[bot1].append(bot2)
+            opponents[bot2].append(bot1)
+
+        series_wins = defaultdict(int)
+        for result in round_results:
+            if result.winner is not None:
+                series_wins[result.winner] += 1
+        for bot1, bot2 in pairings:
+            wins1, wins2 = series_wins[bot1[:-3]], series_wins[bot2[:-3]]
+            wins[bot1] += wins1
+            wins[bot2] += wins2
+            if wins1 > wins2:
+                scores[bot1] += 1
+            elif wins2 > wins1:
+                scores[bot2] += 1
+            else:
+                scores[bot1] += 0.5
+                scores[bot2] += 0.5
+        results.extend(round_results)
+
+    ranked = standings(bot_files, scores, wins, opponents)
+    rankings = [(index + 1, bot[:-3], wins[bot]) for index, bot in enumerate(ranked)]
+    return results, rankings, {bot[:-3]: scores[bot] for bot in bot_files}
+
+
+def run_swiss(bot_files, num_games, rounds=None, events=None, workers=None, trusted=(), seed=None):
+    """
+    Plays a Swiss tournament and ranks the bots by Swiss standings. See play_swiss for the parameters.
+    :return: A list of (rank, bot name, wins) tuples.
+    """
+    return play_swiss(bot_files, num_games, rounds, events, workers, trusted, seed)[1]
@@ -1,9 +1,12 @@
 from player import play_bots
 from collections import defaultdict
 from itertools import combinations
-import glob
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 import os
 from player import Player
+from events import MemorySink, NULL_SINK
+from bot_runner import enter_bot_process
 
 # def run_tournament(bot_files,num_games:int):
 #     scores = defaultdict(int, {bot[:-3]: 0 for bot in bot_files})
@@ -23,24 +26,145 @@ from player import Player
 #     return [(index + 1, bot, wins) for index, (bot, wins) in enumerate(rankings)]
 
 
-def run_tournament(bot_files,num_games:int):
-    players_list = []
-    for bot_file in bot_files:
-        player = Player(bot_file[:-3])    ##edit this line later
-        players_list.append(player)
-    
-    for bot1, bot2 in combinations(players_list, 2):
-        for _ in range(num_games):
-           play_bots(bot1, bot2)
-    
-    rankings = sorted(players_list, key=lambda x: x.wins, reverse=True)
-    # print(rankings)
-    directory = 'uploads/'
-    txt_files = glob.glob(os.path.join(directory, '*.txt'))
-    # Remove each file found
-    for txt_file in txt_files:
-        os.remove(txt_file)
-
-    return [(index + 1, player.name, player.wins) for index, player in enumerate(rankings)]
+# Worker processes used by run_tournament when the caller does not say; 1 plays serially
+TOURNAMENT_WORKERS = int(os.getenv("TOURNAMENT_WORKERS", "1"))
+
+# The outcome of one game. winner and loser are None if a board could not be initialized.
+# record is the game's engine.GameRecord (seed, fleets and shots), None if it never started.
+# latency is a tuple of both players' latency.BotLatency, None if the game was not played.
+GameResult = namedtuple("GameResult", ["pairing", "game", "player1", "player2", "winner", "loser", "record",
+                                       "latency"], defaults=(None, None))
+
+
+def game_seed(seed, pairing, game):
+    """
+    :param seed: A tournament or match seed.
+    :return: The seed of one game of that tournament or match.
+    """
+    return (seed * 1000003 + pairing * 10007 + game) % 2 ** 31
+
+
+def play_pairing(pairing, bot1_file, bot2_file, games, events=None, trusted=(), until=None, seed=None):
+    """
+    Plays one series between two bots with players of its own, so series can run in any process.
+    :param pairing: Index of the pairing in the tournament schedule.
+    :param bot1_file: File name of the first bot.
+    :param bot2_file: File name of the second bot.
+    :param games: Game numbers to play in this series.
+    :param events: Optional EventSink. If None, the events are recorded and returned instead.
+    :param trusted: Bot file names allowed to run inside this process (see bot_runner.InProcessBot).
+    :param until: Optional callable given each GameResult; the series stops early once it returns True.
+    :param seed: Seed the game seeds are derived from (see game_seed); every game draws its own if None.
+    :return: A tuple (results, events) where results is a tuple of GameResult and events is a
+             list of recorded events, or None when a sink was given.
+    """
+    recorder = None
+    if events is None:
+        recorder = events = MemorySink()
+    player1 = Player(bot1_file[:-3], "inprocess" if bot1_file in trusted else None)    ##edit this line later
+    player2 = Player(bot2_file[:-3], "inprocess" if bot2_file in trusted else None)
+    results = []
+    try:
+        for game in games:
+            records = []
+            latencies = []
+            winner = play_bots(player1, player2, events, None if seed is None else game_seed(seed, pairing, game),
+                               records, latencies)
+            if winner == -1:
+                winner = loser = None
+            else:
+                loser = player2.name if winner == player1.name else player1.name
+            results.append(GameResult(pairing, game, player1.name, player2.name, winner, loser,
+                                      records[0] if records else None, latencies[0]))
+            if until is not None and until(results[-1]):
+                break
+    finally:
+        player1.close()
+        player2.close()
+    return tuple(results), recorder.events if recorder else None
+
+
+def _play_task(task, record, trusted, seed):
+    return play_pairing(*task, events=None if record else NULL_SINK, trusted=trusted, seed=seed)
+
+
+def rank_results(bot_files, results):
+    """
+    Merges game results into rankings. Ties keep the order of bot_files, so the same
+    results always produce the same rankings no matter which process played them.
+    :param bot_files: Bot file names in tournament order.
+    :param results: An iterable of GameResult.
+    :return: A list of (rank, bot name, wins) tuples.
+    """
+    wins = {bot_file[:-3]: 0 for bot_file in bot_files}
+    for result in sorted(results, key=lambda r: (r.pairing, r.game)):
+        if result.winner is not None:
+            wins[result.winner] += 1
+    rankings = sorted(wins.items(), key=lambda item: item[1], reverse=True)
+    return [(index + 1, name, count) for index, (name, count) in enumerate(rankings)]
+
+
+def play_round_robin(bot_files, num_games, events=None, workers=None, split_games=False, trusted=(), seed=None):
+    """
+    Plays every pair of bots against each other num_games times.
+    :param bot_files: Bot file names inside the uploads directory.
+    :param num_games: Number of games per pairing.
+    :param events: Optional EventSink for game events; the tournament is silent by default.
+    :param workers: Number of worker processes; defaults to TOURNAMENT_WORKERS. 1 plays in this process.
+    :param split_games: Schedule every game as its own task instead of one task per pairing.
+                        Balances load better when there are few pairings, at the cost of
+                        starting each bot once per game.
+    :param trusted: Bot file names that run inside the worker processes instead of in a
+                    process of their own. Only pass bots flagged as trusted.
+    :param seed: Seed every game's seed is derived from, so the schedule can be replayed;
+                 each game draws its own seed if None.
+    :return: A list of GameResult in schedule order.
+    """
+    return play_pairings(list(combinations(bot_files, 2)), num_games, events, workers, split_games, trusted,
+                         seed=seed)
+
+
+def play_pairings(pairings, num_games, events=None, workers=None, split_games=False, trusted=(), first_pairing=0,
+                  seed=None):
+    """
+    Plays a series of num_games between each given pair of bots. See play_round_robin for the
+    other parameters.
+    :param pairings: A list of (bot1_file, bot2_file) tuples.
+    :param first_pairing: Index given to the first pairing, so results of several calls can be merged.
+    :return: A list of GameResult in schedule order.
+    """
+    workers = workers or TOURNAMENT_WORKERS
+    trusted = frozenset(trusted)
+    tasks = []
+    for pairing, (bot1, bot2) in enumerate(pairings, first_pairing):
+        if split_games:
+            tasks.extend((pairing, bot1, bot2, (game,)) for game in range(num_games))
+        else:
+            tasks.append((pairing, bot1, bot2, tuple(range(num_games))))
+
+    results = []
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            results.extend(play_pairing(*task, events=events, trusted=trusted, seed=seed)[0])
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=enter_bot_process) as pool:
+            # map() yields in task order, so replayed events are deterministic too
+            record = [events is not None] * len(tasks)
+            for task_results, task_events in pool.map(_play_task, tasks, record, [trusted] * len(tasks),
+                                                      [seed] * len(tasks)):
+                results.extend(task_results)
+                if events is not None:
+                    for event in task_events:
+                        events.emit(**event)
+    return results
+
+
+def run_tournament(bot_files,num_games:int,events=None,workers=None,split_games=False,trusted=()):
+    """
+    Plays a round robin and ranks the bots by wins. See play_round_robin for the parameters.
+    :return: A list of (rank, bot name, wins) tuples.
+    """
+    results = play_round_robin(bot_files, num_games, events, workers, split_games, trusted)
+    return rank_results(bot_files, results)
 
 #run_tournament(['Andrew.py', 'Sonam.py'], 2)
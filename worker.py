@@ -0,0 +1,52 @@
+# worker.py
+"""
+Standalone job worker.
+
+    python -m worker [--worker-id NAME] [--poll-interval SECONDS] [--once]
+
+Claims queued matches and tournaments from the database and plays them. Run as
+many workers as you like, on one host or several, against the same
+DATABASE_URL; each job is only ever held by one of them. Set
+EMBEDDED_WORKER=false on the API when dedicated workers are running.
+"""
+import argparse
+import logging
+import time
+from database import engine
+from schema import upgrade_schema
+from jobs import default_worker_id, run_job
+
+logger = logging.getLogger(__name__)
+
+
+def work(worker_id, poll_interval=1.0, once=False):
+    """
+    Runs jobs until interrupted, sleeping while the queue is empty.
+    :param once: Stop as soon as the queue is empty.
+    """
+    logger.info(f"Worker {worker_id} started")
+    while True:
+        try:
+            if run_job(worker_id=worker_id):
+                continue
+        except Exception as e:
+            # Database unavailable or similar; a held lease expires and is reclaimed
+            logger.error(f"Worker {worker_id} error: {e}")
+        if once:
+            return
+        time.sleep(poll_interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run queued matches and tournaments")
+    parser.add_argument("--worker-id", default=None, help="Name recorded on claimed jobs (default host:pid)")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to wait when the queue is empty")
+    parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    upgrade_schema(engine)
+    try:
+        work(args.worker_id or default_worker_id(), args.poll_interval, args.once)
+    except KeyboardInterrupt:
+        pass